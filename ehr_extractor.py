@@ -10,12 +10,62 @@ to ensure reliable extraction of large datasets.
 
 import os
 import json
+import mmap
+import pickle
 import time
 import logging
 import argparse
 import datetime
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple, Iterator
+from typing import Dict, List, Any, Callable, Iterable, Optional, Sequence, Set, Tuple, Iterator
+
+# orjson is optional; fall back to the stdlib json module when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson is optional; it is only needed for streaming extraction
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# numpy is optional; when available, date filters are applied as vectorized masks
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Files at least this large are memory-mapped for parsing instead of copied into a bytes object
+MMAP_THRESHOLD = 1 << 20
+
+# Buffer size for reading and writing large JSON files
+IO_BUFFER_SIZE = 1 << 20
+
+
+def _date_key(value: Any) -> int:
+    """
+    Convert a YYYY-MM-DD date (or datetime) string to an integer YYYYMMDDx key.
+    
+    The last digit is 1 when the value goes on past the date (a datetime) and 0
+    otherwise, so keys order like the strings themselves: a datetime sorts
+    after its bare date and falls outside an end date of that same day.
+    
+    Args:
+        value: Date string to convert
+        
+    Returns:
+        Integer date key, or -1 if the value is missing or not a date
+    """
+    if not isinstance(value, str):
+        return -1
+    digits = value[:10].replace("-", "")
+    if len(digits) != 8 or not digits.isdigit():
+        return -1
+    return int(digits) * 10 + (len(value) > 10)
 
 # Configure logging
 logging.basicConfig(
@@ -31,13 +81,27 @@ logger = logging.getLogger("ehr_extractor")
 class EHRExtractor:
     """Extracts data from legacy EHR systems."""
     
+    # Date field used for date filtering, and whether the file may be streamed, per entity type
+    _ENTITY_SPEC = {
+        "patients": {"date_field": "registration_date", "streamable": False},
+        "encounters": {"date_field": "encounter_date", "streamable": True},
+        "observations": {"date_field": "observation_date", "streamable": True},
+        "medications": {"date_field": "prescription_date", "streamable": True},
+    }
+    
+    # Supported output formats and the file extension used for each
+    OUTPUT_FORMATS = {"json": "json", "ndjson": "ndjson"}
+    
     def __init__(self, 
                  source_system: str,
                  data_dir: str = "./legacy_ehr_data", 
                  output_dir: str = "./extracted_data",
                  batch_size: int = 100,
                  retries: int = 3,
-                 retry_delay: float = 2.0):
+                 retry_delay: float = 2.0,
+                 stream: bool = False,
+                 disk_cache: bool = False,
+                 output_format: str = "json"):
         """
         Initialize the EHR extractor.
         
@@ -48,6 +112,12 @@ class EHRExtractor:
             batch_size: Number of records to process in each batch
             retries: Number of retry attempts for failed operations
             retry_delay: Delay between retry attempts (in seconds)
+            stream: Parse encounter, observation and medication files incrementally
+                (requires ijson) instead of loading and caching them whole
+            disk_cache: Keep a pickled copy of each parsed file in a .cache
+                directory inside data_dir and reuse it while the file is unchanged
+            output_format: Format of the extracted entity files, "json" (one array
+                per file) or "ndjson" (one record per line)
         """
         self.source_system = source_system
         self.data_dir = data_dir
@@ -55,42 +125,58 @@ class EHRExtractor:
         self.batch_size = batch_size
         self.retries = retries
         self.retry_delay = retry_delay
+        self.stream = stream
+        self.disk_cache = disk_cache
+        
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.output_format = output_format
+        
+        # Parsed entity files, keyed by entity type
+        self._json_cache: Dict[str, List[Dict[str, Any]]] = {}
+        # Key value -> record positions, keyed by (entity type, key field)
+        self._index_cache: Dict[Tuple[str, str], Dict[Any, List[int]]] = {}
+        # Integer date key per record position, keyed by (entity type, date field)
+        self._date_key_cache: Dict[Tuple[str, str], List[int]] = {}
+        # numpy copies of the date keys, used for vectorized date filtering
+        self._date_array_cache: Dict[Tuple[str, str], Any] = {}
+        # numpy copies of key fields, used for vectorized ID filtering
+        self._key_array_cache: Dict[Tuple[str, str], Tuple[Any, Any]] = {}
         
         # Create output directory if it doesn't exist
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            logger.info(f"Created output directory: {output_dir}")
+        os.makedirs(output_dir, exist_ok=True)
+        
+        if stream and ijson is None:
+            logger.warning("ijson is not installed; streaming extraction will load files whole")
         
         # Initialize connection to the appropriate EHR system
         self._initialize_connection()
     
     def _initialize_connection(self) -> None:
         """Initialize connection to the legacy EHR system."""
-        logger.info(f"Initializing connection to {self.source_system} EHR system")
+        logger.info("Initializing connection to %s EHR system", self.source_system)
         
         # For file-based extraction (our synthetic data)
         if self.source_system.lower() in ["file", "synthetic", "test", "local"]:
             self.extraction_method = "file"
             
-            # Check if data directory exists
-            if not os.path.exists(self.data_dir):
-                logger.error(f"Data directory not found: {self.data_dir}")
-                raise FileNotFoundError(f"Data directory not found: {self.data_dir}")
+            # List the data directory once, which also checks that it exists
+            try:
+                with os.scandir(self.data_dir) as entries:
+                    present_files = {entry.name for entry in entries}
+            except (FileNotFoundError, NotADirectoryError):
+                logger.error("Data directory not found: %s", self.data_dir)
+                raise FileNotFoundError(f"Data directory not found: {self.data_dir}") from None
             
             # Check for required data files
-            required_files = ["patients.json", "encounters.json", "observations.json", "medications.json"]
-            missing_files = []
-            
-            for file in required_files:
-                file_path = os.path.join(self.data_dir, file)
-                if not os.path.exists(file_path):
-                    missing_files.append(file)
+            required_files = [f"{entity_type}.json" for entity_type in self._ENTITY_SPEC]
+            missing_files = [file for file in required_files if file not in present_files]
             
             if missing_files:
-                logger.error(f"Missing data files: {', '.join(missing_files)}")
+                logger.error("Missing data files: %s", ', '.join(missing_files))
                 raise FileNotFoundError(f"Missing data files: {', '.join(missing_files)}")
             
-            logger.info(f"Successfully connected to file-based EHR data in {self.data_dir}")
+            logger.info("Successfully connected to file-based EHR data in %s", self.data_dir)
             return
             
         # For API-based extraction (for real systems)
@@ -112,80 +198,411 @@ class EHRExtractor:
             logger.info("Allscripts API connection would be initialized here")
             
         else:
-            logger.error(f"Unsupported EHR system: {self.source_system}")
+            logger.error("Unsupported EHR system: %s", self.source_system)
             raise ValueError(f"Unsupported EHR system: {self.source_system}")
     
     def _load_json_data(self, entity_type: str) -> List[Dict[str, Any]]:
         """
         Load data from JSON file for file-based extraction.
         
+        Parsed data is cached per entity type, so repeated extractions in the
+        same run only read each file once.
+        
         Args:
             entity_type: Type of entity to load (patients, encounters, etc.)
             
         Returns:
             List of entities loaded from JSON
         """
+        if entity_type in self._json_cache:
+            return self._json_cache[entity_type]
+        
         file_path = os.path.join(self.data_dir, f"{entity_type}.json")
         
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                logger.info(f"Loaded {len(data)} {entity_type} from {file_path}")
+        if self.disk_cache:
+            data = self._read_disk_cache(entity_type, file_path)
+            if data is not None:
+                logger.info("Loaded %d %s from disk cache", len(data), entity_type)
+                self._json_cache[entity_type] = data
                 return data
+        
+        try:
+            if orjson is not None:
+                with open(file_path, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                            data = orjson.loads(view)
+                    else:
+                        data = orjson.loads(f.read())
+            else:
+                with open(file_path, 'r', buffering=IO_BUFFER_SIZE) as f:
+                    data = json.load(f)
+            logger.info("Loaded %d %s from %s", len(data), entity_type, file_path)
         except Exception as e:
-            logger.error(f"Error loading {entity_type} data: {str(e)}")
+            logger.error("Error loading %s data: %s", entity_type, e)
             raise
+        
+        if self.disk_cache:
+            self._write_disk_cache(entity_type, file_path, data)
+        self._json_cache[entity_type] = data
+        return data
     
-    def extract_patients(self, 
-                         start_date: Optional[str] = None, 
-                         end_date: Optional[str] = None,
-                         patient_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    def _disk_cache_path(self, entity_type: str) -> Path:
+        """Get the path of the pickled cache file for an entity type."""
+        return Path(self.data_dir) / ".cache" / f"{entity_type}.pkl"
+    
+    @staticmethod
+    def _file_signature(file_path: str) -> Tuple[int, int]:
+        """Get the (modification time, size) signature used to validate cache files."""
+        stat = os.stat(file_path)
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _read_disk_cache(self, entity_type: str, file_path: str) -> Optional[List[Dict[str, Any]]]:
         """
-        Extract patient data from the legacy EHR system.
+        Read parsed entity data from the on-disk cache.
+        
+        The cache file holds the source file signature followed by the data, so a
+        stale cache is rejected without unpickling the data.
+        
+        Args:
+            entity_type: Type of entity to load (patients, encounters, etc.)
+            file_path: Path of the source JSON file
+            
+        Returns:
+            Cached entities, or None if there is no valid cache for the current file
+        """
+        cache_path = self._disk_cache_path(entity_type)
+        if not cache_path.exists():
+            return None
+        
+        try:
+            with open(cache_path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+                if pickle.load(f) != self._file_signature(file_path):
+                    return None
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning("Ignoring unreadable cache for %s: %s", entity_type, e)
+            return None
+    
+    def _write_disk_cache(self, entity_type: str, file_path: str, data: List[Dict[str, Any]]) -> None:
+        """
+        Write parsed entity data to the on-disk cache.
+        
+        Args:
+            entity_type: Type of entity being cached (patients, encounters, etc.)
+            file_path: Path of the source JSON file
+            data: Parsed entities to cache
+        """
+        cache_path = self._disk_cache_path(entity_type)
+        temp_path = cache_path.with_suffix(".tmp")
+        
+        try:
+            cache_path.parent.mkdir(exist_ok=True)
+            with open(temp_path, 'wb', buffering=IO_BUFFER_SIZE) as f:
+                pickle.dump(self._file_signature(file_path), f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+        except Exception as e:
+            logger.warning("Could not write cache for %s: %s", entity_type, e)
+    
+    def _iter_json_data(self, entity_type: str) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the records of a JSON file without loading it whole.
+        
+        Falls back to the cached (or freshly loaded) data when the entity is
+        already cached or ijson is not installed.
+        
+        Args:
+            entity_type: Type of entity to load (patients, encounters, etc.)
+            
+        Yields:
+            Entity records in file order
+        """
+        if entity_type in self._json_cache or ijson is None:
+            yield from self._load_json_data(entity_type)
+            return
+        
+        file_path = os.path.join(self.data_dir, f"{entity_type}.json")
+        logger.info("Streaming %s from %s", entity_type, file_path)
+        
+        try:
+            with open(file_path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+                yield from ijson.items(f, 'item', use_float=True, buf_size=IO_BUFFER_SIZE)
+        except Exception as e:
+            logger.error("Error streaming %s data: %s", entity_type, e)
+            raise
+    
+    def _use_stream(self, entity_type: str) -> bool:
+        """Check whether an entity should be streamed rather than loaded whole."""
+        return self.stream and ijson is not None and entity_type not in self._json_cache
+    
+    def clear_cache(self) -> None:
+        """Discard cached entity data, e.g. after the underlying files have changed."""
+        self._json_cache.clear()
+        self._index_cache.clear()
+        self._date_key_cache.clear()
+        self._date_array_cache.clear()
+        self._key_array_cache.clear()
+    
+    def _get_index(self, entity_type: str, key_field: str) -> Dict[Any, List[int]]:
+        """
+        Get an index mapping values of a key field to record positions.
+        
+        Args:
+            entity_type: Type of entity to index (patients, encounters, etc.)
+            key_field: Field to index on (patient_id, encounter_id)
+            
+        Returns:
+            Dictionary mapping each key value to the positions of its records
+        """
+        cache_key = (entity_type, key_field)
+        index = self._index_cache.get(cache_key)
+        if index is None:
+            index = {}
+            for position, record in enumerate(self._load_json_data(entity_type)):
+                index.setdefault(record.get(key_field), []).append(position)
+            self._index_cache[cache_key] = index
+        return index
+    
+    def _get_date_keys(self, entity_type: str, date_field: str) -> List[int]:
+        """
+        Get the integer date key of every record, computed once per entity.
+        
+        Args:
+            entity_type: Type of entity (patients, encounters, etc.)
+            date_field: Field holding the record date
+            
+        Returns:
+            Date keys in record order (-1 for records without a valid date)
+        """
+        cache_key = (entity_type, date_field)
+        date_keys = self._date_key_cache.get(cache_key)
+        if date_keys is None:
+            date_keys = [_date_key(record.get(date_field)) for record in self._load_json_data(entity_type)]
+            self._date_key_cache[cache_key] = date_keys
+        return date_keys
+    
+    def _candidate_positions(self, entity_type: str, **key_filters: Optional[Set[str]]) -> List[int]:
+        """
+        Narrow an entity's records down using the most selective key filter.
+        
+        Only the smallest filter set is looked up in the index; callers still
+        apply every filter to the selected records.
+        
+        Args:
+            entity_type: Type of entity (patients, encounters, etc.)
+            **key_filters: Key field name mapped to the set of allowed values, or None
+            
+        Returns:
+            Positions of records that may match the filters, in file order
+        """
+        all_positions = range(len(self._load_json_data(entity_type)))
+        active_filters = [(field, keys) for field, keys in key_filters.items() if keys is not None]
+        if not active_filters:
+            return all_positions
+        
+        key_field, keys = min(active_filters, key=lambda item: len(item[1]))
+        index = self._get_index(entity_type, key_field)
+        if len(keys) >= len(index):
+            return all_positions
+        
+        return sorted(pos for key in keys for pos in index.get(key, ()))
+    
+    def _get_date_array(self, entity_type: str, date_field: str) -> Any:
+        """Get the date keys of an entity as a cached numpy int64 array."""
+        cache_key = (entity_type, date_field)
+        date_array = self._date_array_cache.get(cache_key)
+        if date_array is None:
+            date_array = np.array(self._get_date_keys(entity_type, date_field), dtype=np.int64)
+            self._date_array_cache[cache_key] = date_array
+        return date_array
+    
+    def _get_key_array(self, entity_type: str, key_field: str) -> Tuple[Any, Any]:
+        """
+        Get the values of a key field as cached numpy arrays.
+        
+        Returns:
+            Tuple of (string array of the values, boolean array marking the records
+            whose value is a string). Missing and non-string values are stored as
+            empty strings, so callers mask them out with the second array.
+        """
+        cache_key = (entity_type, key_field)
+        key_arrays = self._key_array_cache.get(cache_key)
+        if key_arrays is None:
+            values = [record.get(key_field) for record in self._load_json_data(entity_type)]
+            present = np.array([isinstance(value, str) for value in values], dtype=bool)
+            key_array = np.array([value if isinstance(value, str) else "" for value in values], dtype=str)
+            key_arrays = self._key_array_cache[cache_key] = (key_array, present)
+        return key_arrays
+    
+    def _positions_in_date_range(self,
+                                 entity_type: str,
+                                 date_field: str,
+                                 positions: Sequence[int],
+                                 date_range: Tuple[int, int]) -> List[int]:
+        """
+        Keep the record positions whose date key falls in a range, using numpy.
+        
+        Args:
+            entity_type: Type of entity (patients, encounters, etc.)
+            date_field: Field holding the record date
+            positions: Candidate record positions, in file order
+            date_range: Inclusive (start key, end key) range
+            
+        Returns:
+            Positions of records inside the date range, in file order
+        """
+        date_array = self._get_date_array(entity_type, date_field)
+        start_key, end_key = date_range
+        if isinstance(positions, range):
+            return np.flatnonzero((date_array >= start_key) & (date_array <= end_key)).tolist()
+        
+        candidates = np.asarray(positions, dtype=np.intp)
+        candidate_dates = date_array[candidates]
+        return candidates[(candidate_dates >= start_key) & (candidate_dates <= end_key)].tolist()
+    
+    def _dated_records(self,
+                       entity_type: str,
+                       date_field: str,
+                       stream: bool = False,
+                       date_range: Optional[Tuple[int, int]] = None,
+                       **key_filters: Optional[Set[str]]) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """
+        Iterate over candidate records paired with their integer date keys.
+        
+        Args:
+            entity_type: Type of entity (patients, encounters, etc.)
+            date_field: Field holding the record date
+            stream: Whether to stream the file instead of using the cached data
+            date_range: Optional inclusive (start key, end key) range to pre-filter
+                on when numpy is available
+            **key_filters: Key field name mapped to the set of allowed values, or None
+            
+        Yields:
+            Tuples of (record, date key)
+        """
+        if stream:
+            for record in self._iter_json_data(entity_type):
+                yield record, _date_key(record.get(date_field))
+            return
+        
+        records = self._load_json_data(entity_type)
+        date_keys = self._get_date_keys(entity_type, date_field)
+        positions = self._candidate_positions(entity_type, **key_filters)
+        if date_range is not None and np is not None:
+            positions = self._positions_in_date_range(entity_type, date_field, positions, date_range)
+        
+        for pos in positions:
+            yield records[pos], date_keys[pos]
+    
+    @staticmethod
+    def _date_range(start_date: Optional[str], end_date: Optional[str]) -> Optional[Tuple[int, int]]:
+        """
+        Convert optional date filters to an inclusive range of integer date keys.
         
         Args:
             start_date: Optional start date filter (YYYY-MM-DD)
             end_date: Optional end date filter (YYYY-MM-DD)
-            patient_ids: Optional list of specific patient IDs to extract
             
         Returns:
-            List of extracted patients
+            Tuple of (start key, end key), or None if no date filter is set.
+            Records without a date fall outside any range.
+        """
+        if not (start_date or end_date):
+            return None
+        start_key = _date_key(start_date) if start_date else 0
+        end_key = _date_key(end_date) if end_date else 999999999
+        if start_key < 0:
+            raise ValueError(f"Invalid start date: {start_date}")
+        if end_key < 0:
+            raise ValueError(f"Invalid end date: {end_date}")
+        return start_key, end_key
+    
+    @staticmethod
+    def _compile_filter(date_range: Optional[Tuple[int, int]],
+                        **key_filters: Optional[Set[str]]) -> Optional[Callable[[Dict[str, Any], int], bool]]:
         """
-        logger.info(f"Extracting patients from {self.source_system}")
+        Build a record predicate specialized for the filters that are actually set.
         
-        if start_date:
-            logger.info(f"Filtering patients from {start_date}")
-        if end_date:
-            logger.info(f"Filtering patients to {end_date}")
-        if patient_ids:
-            logger.info(f"Extracting {len(patient_ids)} specific patients")
+        Deciding which filters apply once per extraction keeps the per-record
+        check down to the comparisons that matter.
+        
+        Args:
+            date_range: Optional inclusive (start key, end key) range
+            **key_filters: Key field name mapped to the set of allowed values, or None
+            
+        Returns:
+            Predicate taking (record, date key), or None if nothing is filtered
+        """
+        checks = [(field, keys) for field, keys in key_filters.items() if keys is not None]
+        
+        if date_range is None:
+            if not checks:
+                return None
+            if len(checks) == 1:
+                (field, keys), = checks
+                return lambda record, date_key: record.get(field) in keys
+            (field_a, keys_a), (field_b, keys_b) = checks
+            return lambda record, date_key: record.get(field_a) in keys_a and record.get(field_b) in keys_b
+        
+        start_key, end_key = date_range
+        if not checks:
+            return lambda record, date_key: start_key <= date_key <= end_key
+        if len(checks) == 1:
+            (field, keys), = checks
+            return lambda record, date_key: start_key <= date_key <= end_key and record.get(field) in keys
+        (field_a, keys_a), (field_b, keys_b) = checks
+        return lambda record, date_key: (start_key <= date_key <= end_key
+                                         and record.get(field_a) in keys_a
+                                         and record.get(field_b) in keys_b)
+    
+    @staticmethod
+    def _apply_filter(records: Iterable[Tuple[Dict[str, Any], int]],
+                      predicate: Optional[Callable[[Dict[str, Any], int], bool]]) -> List[Dict[str, Any]]:
+        """Collect the records accepted by a compiled predicate."""
+        if predicate is None:
+            return [record for record, _ in records]
+        return [record for record, date_key in records if predicate(record, date_key)]
+    
+    def _extract(self,
+                 entity_type: str,
+                 start_date: Optional[str] = None,
+                 end_date: Optional[str] = None,
+                 **id_filters: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """
+        Extract records of any entity type, driven by _ENTITY_SPEC.
+        
+        Args:
+            entity_type: Type of entity to extract (patients, encounters, etc.)
+            start_date: Optional start date filter (YYYY-MM-DD)
+            end_date: Optional end date filter (YYYY-MM-DD)
+            **id_filters: Key field name (patient_id, encounter_id) mapped to an
+                optional list of allowed IDs; None disables the filter, while an
+                empty list matches nothing
+            
+        Returns:
+            List of extracted records
+        """
+        # An empty ID filter can't match anything, so skip loading the file
+        if any(ids is not None and not ids for ids in id_filters.values()):
+            logger.info("Extracted 0 %s after filtering", entity_type)
+            return []
         
         # For file-based extraction
         if self.extraction_method == "file":
-            patients = self._load_json_data("patients")
+            spec = self._ENTITY_SPEC[entity_type]
+            key_filters = {field: set(ids) if ids is not None else None for field, ids in id_filters.items()}
+            date_range = self._date_range(start_date, end_date)
+            stream = spec["streamable"] and self._use_stream(entity_type)
             
             # Apply filters
-            filtered_patients = []
-            for patient in patients:
-                # Apply patient ID filter
-                if patient_ids and patient.get("patient_id") not in patient_ids:
-                    continue
-                
-                # Apply date filters (using registration_date)
-                if start_date or end_date:
-                    reg_date = patient.get("registration_date")
-                    if not reg_date:
-                        continue
-                    
-                    if start_date and reg_date < start_date:
-                        continue
-                    if end_date and reg_date > end_date:
-                        continue
-                
-                filtered_patients.append(patient)
-            
-            logger.info(f"Extracted {len(filtered_patients)} patients after filtering")
-            return filtered_patients
+            records = self._dated_records(
+                entity_type, spec["date_field"], stream, date_range=date_range, **key_filters
+            )
+            filtered_records = self._apply_filter(records, self._compile_filter(date_range, **key_filters))
+            
+            logger.info("Extracted %d %s after filtering", len(filtered_records), entity_type)
+            return filtered_records
             
         # For API-based extraction
         elif self.extraction_method == "epic_api":
@@ -195,9 +612,35 @@ class EHRExtractor:
             return []
         
         else:
-            logger.error(f"Extraction method not implemented: {self.extraction_method}")
+            logger.error("Extraction method not implemented: %s", self.extraction_method)
             return []
     
+    def extract_patients(self, 
+                         start_date: Optional[str] = None, 
+                         end_date: Optional[str] = None,
+                         patient_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Extract patient data from the legacy EHR system.
+        
+        Args:
+            start_date: Optional start date filter (YYYY-MM-DD)
+            end_date: Optional end date filter (YYYY-MM-DD)
+            patient_ids: Optional list of specific patient IDs to extract
+            
+        Returns:
+            List of extracted patients
+        """
+        logger.info("Extracting patients from %s", self.source_system)
+        
+        if start_date:
+            logger.info("Filtering patients from %s", start_date)
+        if end_date:
+            logger.info("Filtering patients to %s", end_date)
+        if patient_ids:
+            logger.info("Extracting %d specific patients", len(patient_ids))
+        
+        return self._extract("patients", start_date, end_date, patient_id=patient_ids)
+    
     def extract_encounters(self, 
                           patient_ids: Optional[List[str]] = None,
                           start_date: Optional[str] = None,
@@ -213,51 +656,16 @@ class EHRExtractor:
         Returns:
             List of extracted encounters
         """
-        logger.info(f"Extracting encounters from {self.source_system}")
+        logger.info("Extracting encounters from %s", self.source_system)
         
         if patient_ids:
-            logger.info(f"Filtering encounters for {len(patient_ids)} patients")
+            logger.info("Filtering encounters for %d patients", len(patient_ids))
         if start_date:
-            logger.info(f"Filtering encounters from {start_date}")
+            logger.info("Filtering encounters from %s", start_date)
         if end_date:
-            logger.info(f"Filtering encounters to {end_date}")
-        
-        # For file-based extraction
-        if self.extraction_method == "file":
-            encounters = self._load_json_data("encounters")
-            
-            # Apply filters
-            filtered_encounters = []
-            for encounter in encounters:
-                # Apply patient ID filter
-                if patient_ids and encounter.get("patient_id") not in patient_ids:
-                    continue
-                
-                # Apply date filters
-                if start_date or end_date:
-                    enc_date = encounter.get("encounter_date")
-                    if not enc_date:
-                        continue
-                    
-                    if start_date and enc_date < start_date:
-                        continue
-                    if end_date and enc_date > end_date:
-                        continue
-                
-                filtered_encounters.append(encounter)
-            
-            logger.info(f"Extracted {len(filtered_encounters)} encounters after filtering")
-            return filtered_encounters
-            
-        # For API-based extraction
-        elif self.extraction_method == "epic_api":
-            # This would be implemented for a real system
-            logger.info("EPIC API extraction would happen here")
-            return []
+            logger.info("Filtering encounters to %s", end_date)
         
-        else:
-            logger.error(f"Extraction method not implemented: {self.extraction_method}")
-            return []
+        return self._extract("encounters", start_date, end_date, patient_id=patient_ids)
     
     def extract_observations(self,
                            patient_ids: Optional[List[str]] = None,
@@ -276,48 +684,11 @@ class EHRExtractor:
         Returns:
             List of extracted observations
         """
-        logger.info(f"Extracting observations from {self.source_system}")
+        logger.info("Extracting observations from %s", self.source_system)
         
-        # For file-based extraction
-        if self.extraction_method == "file":
-            observations = self._load_json_data("observations")
-            
-            # Apply filters
-            filtered_observations = []
-            for observation in observations:
-                # Apply patient ID filter
-                if patient_ids and observation.get("patient_id") not in patient_ids:
-                    continue
-                
-                # Apply encounter ID filter
-                if encounter_ids and observation.get("encounter_id") not in encounter_ids:
-                    continue
-                
-                # Apply date filters
-                if start_date or end_date:
-                    obs_date = observation.get("observation_date")
-                    if not obs_date:
-                        continue
-                    
-                    if start_date and obs_date < start_date:
-                        continue
-                    if end_date and obs_date > end_date:
-                        continue
-                
-                filtered_observations.append(observation)
-            
-            logger.info(f"Extracted {len(filtered_observations)} observations after filtering")
-            return filtered_observations
-            
-        # For API-based extraction
-        elif self.extraction_method == "epic_api":
-            # This would be implemented for a real system
-            logger.info("EPIC API extraction would happen here")
-            return []
-        
-        else:
-            logger.error(f"Extraction method not implemented: {self.extraction_method}")
-            return []
+        return self._extract(
+            "observations", start_date, end_date, patient_id=patient_ids, encounter_id=encounter_ids
+        )
     
     def extract_medications(self,
                           patient_ids: Optional[List[str]] = None,
@@ -336,48 +707,11 @@ class EHRExtractor:
         Returns:
             List of extracted medications
         """
-        logger.info(f"Extracting medications from {self.source_system}")
-        
-        # For file-based extraction
-        if self.extraction_method == "file":
-            medications = self._load_json_data("medications")
-            
-            # Apply filters
-            filtered_medications = []
-            for medication in medications:
-                # Apply patient ID filter
-                if patient_ids and medication.get("patient_id") not in patient_ids:
-                    continue
-                
-                # Apply encounter ID filter
-                if encounter_ids and medication.get("encounter_id") not in encounter_ids:
-                    continue
-                
-                # Apply date filters
-                if start_date or end_date:
-                    med_date = medication.get("prescription_date")
-                    if not med_date:
-                        continue
-                    
-                    if start_date and med_date < start_date:
-                        continue
-                    if end_date and med_date > end_date:
-                        continue
-                
-                filtered_medications.append(medication)
-            
-            logger.info(f"Extracted {len(filtered_medications)} medications after filtering")
-            return filtered_medications
-            
-        # For API-based extraction
-        elif self.extraction_method == "epic_api":
-            # This would be implemented for a real system
-            logger.info("EPIC API extraction would happen here")
-            return []
+        logger.info("Extracting medications from %s", self.source_system)
         
-        else:
-            logger.error(f"Extraction method not implemented: {self.extraction_method}")
-            return []
+        return self._extract(
+            "medications", start_date, end_date, patient_id=patient_ids, encounter_id=encounter_ids
+        )
     
     def batch_extract_patients(self,
                              start_date: Optional[str] = None,
@@ -393,15 +727,31 @@ class EHRExtractor:
             Batches of patient records
         """
         if self.extraction_method == "file":
-            # Load all patients first
-            all_patients = self.extract_patients(start_date=start_date, end_date=end_date)
-            
-            # Process in batches
-            total_patients = len(all_patients)
-            for i in range(0, total_patients, self.batch_size):
-                batch = all_patients[i:i + self.batch_size]
-                logger.info(f"Processing batch {i//self.batch_size + 1} with {len(batch)} patients")
+            logger.info("Extracting patients from %s in batches of %d", self.source_system, self.batch_size)
+            date_field = self._ENTITY_SPEC["patients"]["date_field"]
+            predicate = self._compile_filter(self._date_range(start_date, end_date))
+            
+            # Filter patients as they are read, so only one batch is held at a time
+            patients = self._iter_json_data("patients")
+            if predicate is not None:
+                patients = (
+                    patient for patient in patients
+                    if predicate(patient, _date_key(patient.get(date_field)))
+                )
+            
+            # Per-batch progress is only logged at DEBUG; INFO gets a single summary
+            batch_number = 0
+            total_patients = 0
+            while True:
+                batch = list(itertools.islice(patients, self.batch_size))
+                if not batch:
+                    break
+                batch_number += 1
+                total_patients += len(batch)
+                logger.debug("Processing batch %d with %d patients", batch_number, len(batch))
                 yield batch
+            
+            logger.info("Extracted %d patients in %d batches", total_patients, batch_number)
         
         else:
             # For API-based systems, this would use pagination
@@ -420,12 +770,12 @@ class EHRExtractor:
         Returns:
             Dictionary containing complete patient data
         """
-        logger.info(f"Extracting complete patient record for {patient_id}")
+        logger.info("Extracting complete patient record for %s", patient_id)
         
         # Extract patient data
         patients = self.extract_patients(patient_ids=[patient_id])
         if not patients:
-            logger.warning(f"Patient not found: {patient_id}")
+            logger.warning("Patient not found: %s", patient_id)
             return {"patient": None, "encounters": [], "observations": [], "medications": []}
         
         patient = patients[0]
@@ -450,8 +800,8 @@ class EHRExtractor:
             "medications": medications
         }
         
-        logger.info(f"Extracted patient record with {len(encounters)} encounters, "
-                  f"{len(observations)} observations, and {len(medications)} medications")
+        logger.info("Extracted patient record with %d encounters, %d observations, and %d medications",
+                    len(encounters), len(observations), len(medications))
         
         return patient_record
     
@@ -468,7 +818,13 @@ class EHRExtractor:
         Returns:
             Dictionary containing all extracted data
         """
-        logger.info(f"Starting extraction of all data from {self.source_system}")
+        logger.info("Starting extraction of all data from %s", self.source_system)
+        
+        # With numpy, filter every file in one vectorized pass over cached columns.
+        # Without numpy, and when streaming or reading from an API, each entity is
+        # extracted in turn, with observations and medications loaded concurrently.
+        if np is not None and self.extraction_method == "file" and not self.stream:
+            return self._extract_all_vectorized(start_date, end_date)
         
         # Extract patients
         patients = self.extract_patients(start_date=start_date, end_date=end_date)
@@ -485,18 +841,24 @@ class EHRExtractor:
         
         if encounters:
             encounter_ids = [e["encounter_id"] for e in encounters]
-            observations = self.extract_observations(
-                patient_ids=patient_ids,
-                encounter_ids=encounter_ids,
-                start_date=start_date,
-                end_date=end_date
-            )
-            medications = self.extract_medications(
-                patient_ids=patient_ids,
-                encounter_ids=encounter_ids,
-                start_date=start_date,
-                end_date=end_date
-            )
+            # Observations and medications come from independent files, so load them concurrently
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                observations_future = executor.submit(
+                    self.extract_observations,
+                    patient_ids=patient_ids,
+                    encounter_ids=encounter_ids,
+                    start_date=start_date,
+                    end_date=end_date
+                )
+                medications_future = executor.submit(
+                    self.extract_medications,
+                    patient_ids=patient_ids,
+                    encounter_ids=encounter_ids,
+                    start_date=start_date,
+                    end_date=end_date
+                )
+                observations = observations_future.result()
+                medications = medications_future.result()
         else:
             observations = []
             medications = []
@@ -509,39 +871,156 @@ class EHRExtractor:
             "medications": medications
         }
         
-        logger.info(f"Extracted {len(patients)} patients, {len(encounters)} encounters, "
-                  f"{len(observations)} observations, and {len(medications)} medications")
+        logger.info("Extracted %d patients, %d encounters, %d observations, and %d medications",
+                    len(patients), len(encounters), len(observations), len(medications))
+        
+        return extracted_data
+    
+    def _extract_all_vectorized(self,
+                                start_date: Optional[str] = None,
+                                end_date: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Extract all data using numpy masks instead of per-record predicates.
+        
+        Date and ID filters for all four entity types are computed as boolean masks
+        over cached column arrays, chaining the kept patient IDs into the
+        encounter mask and the kept encounter IDs into the observation and
+        medication masks. Produces the same result as the per-entity path.
+        
+        Args:
+            start_date: Optional start date filter (YYYY-MM-DD)
+            end_date: Optional end date filter (YYYY-MM-DD)
+            
+        Returns:
+            Dictionary containing all extracted data
+        """
+        date_range = self._date_range(start_date, end_date)
+        
+        def date_mask(entity_type: str) -> Any:
+            date_array = self._get_date_array(entity_type, self._ENTITY_SPEC[entity_type]["date_field"])
+            if date_range is None:
+                return np.ones(len(date_array), dtype=bool)
+            start_key, end_key = date_range
+            return (date_array >= start_key) & (date_array <= end_key)
+        
+        def kept_keys(entity_type: str, key_field: str, mask: Any) -> Any:
+            key_array, present = self._get_key_array(entity_type, key_field)
+            return key_array[mask & present]
+        
+        def key_mask(entity_type: str, key_field: str, keys: Any) -> Any:
+            key_array, present = self._get_key_array(entity_type, key_field)
+            return present & np.isin(key_array, keys)
+        
+        def select(entity_type: str, mask: Any) -> List[Dict[str, Any]]:
+            records = self._load_json_data(entity_type)
+            return [records[pos] for pos in np.flatnonzero(mask).tolist()]
+        
+        patient_mask = date_mask("patients")
+        if not patient_mask.any():
+            logger.warning("No patients found matching criteria")
+            return {"patients": [], "encounters": [], "observations": [], "medications": []}
+        patient_ids = kept_keys("patients", "patient_id", patient_mask)
+        
+        encounter_mask = date_mask("encounters") & key_mask("encounters", "patient_id", patient_ids)
+        encounter_ids = kept_keys("encounters", "encounter_id", encounter_mask)
+        
+        related_masks = {}
+        for entity_type in ("observations", "medications"):
+            related_masks[entity_type] = (
+                date_mask(entity_type)
+                & key_mask(entity_type, "patient_id", patient_ids)
+                & key_mask(entity_type, "encounter_id", encounter_ids)
+            )
+        
+        # Build complete dataset
+        extracted_data = {
+            "patients": select("patients", patient_mask),
+            "encounters": select("encounters", encounter_mask),
+            "observations": select("observations", related_masks["observations"]),
+            "medications": select("medications", related_masks["medications"])
+        }
+        
+        logger.info("Extracted %d patients, %d encounters, %d observations, and %d medications",
+                    len(extracted_data['patients']), len(extracted_data['encounters']),
+                    len(extracted_data['observations']), len(extracted_data['medications']))
         
         return extracted_data
     
+    def _write_json(self, file_path: str, data: Any) -> None:
+        """
+        Write data to a pretty-printed JSON file.
+        
+        Args:
+            file_path: Path of the file to write
+            data: The data to serialize
+        """
+        if orjson is not None:
+            with open(file_path, 'wb', buffering=IO_BUFFER_SIZE) as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(file_path, 'w', buffering=IO_BUFFER_SIZE) as f:
+                json.dump(data, f, indent=2)
+    
+    def _write_ndjson(self, file_path: str, records: List[Dict[str, Any]]) -> None:
+        """
+        Write records as newline-delimited JSON, one compact record per line.
+        
+        Args:
+            file_path: Path of the file to write
+            records: The records to serialize
+        """
+        if orjson is not None:
+            with open(file_path, 'wb', buffering=IO_BUFFER_SIZE) as f:
+                for record in records:
+                    f.write(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE))
+        else:
+            with open(file_path, 'w', buffering=IO_BUFFER_SIZE) as f:
+                for record in records:
+                    f.write(json.dumps(record))
+                    f.write("\n")
+    
+    def _save_entities(self, item: Tuple[str, List[Dict[str, Any]]]) -> None:
+        """
+        Save the extracted records of one entity type to its JSON file.
+        
+        Args:
+            item: Tuple of (entity type, records)
+        """
+        entity_type, entities = item
+        extension = self.OUTPUT_FORMATS[self.output_format]
+        filename = os.path.join(self.output_dir, f"{entity_type}.{extension}")
+        if self.output_format == "ndjson":
+            self._write_ndjson(filename, entities)
+        else:
+            self._write_json(filename, entities)
+        logger.info("Saved %d %s to %s", len(entities), entity_type, filename)
+    
     def save_extracted_data(self, data: Dict[str, Any]) -> None:
         """
-        Save extracted data to JSON files.
+        Save extracted data to JSON (or NDJSON) files.
         
         Args:
             data: The data to save
         """
-        # Save each entity type to a separate file
-        for entity_type, entities in data.items():
-            filename = os.path.join(self.output_dir, f"{entity_type}.json")
-            with open(filename, 'w') as f:
-                json.dump(entities, f, indent=2)
-            logger.info(f"Saved {len(entities)} {entity_type} to {filename}")
+        # Save each entity type to a separate file, writing the files concurrently
+        if data:
+            with ThreadPoolExecutor(max_workers=len(data)) as executor:
+                list(executor.map(self._save_entities, data.items()))
         
-        # Save metadata about the extraction
+        # Save metadata about the extraction once every entity file is written
         metadata = {
             "extraction_time": datetime.datetime.now().isoformat(),
             "source_system": self.source_system,
+            "output_format": self.output_format,
             "entity_counts": {
                 entity_type: len(entities) for entity_type, entities in data.items()
             }
         }
         
         metadata_file = os.path.join(self.output_dir, "extraction_metadata.json")
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        self._write_json(metadata_file, metadata)
         
-        logger.info(f"Saved extraction metadata to {metadata_file}")
+        logger.info("Saved extraction metadata to %s", metadata_file)
 
 
 def main():
@@ -554,6 +1033,9 @@ def main():
     parser.add_argument('--start-date', help='Start date filter (YYYY-MM-DD)')
     parser.add_argument('--end-date', help='End date filter (YYYY-MM-DD)')
     parser.add_argument('--patient', help='Extract data for a specific patient ID')
+    parser.add_argument('--stream', action='store_true', help='Stream large JSON files with ijson instead of loading them whole')
+    parser.add_argument('--output-format', choices=['json', 'ndjson'], default='json', help='Format of the extracted entity files')
+    parser.add_argument('--disk-cache', action='store_true', help='Cache parsed data files in <data-dir>/.cache to speed up repeat runs')
     
     args = parser.parse_args()
     
@@ -563,7 +1045,10 @@ def main():
             source_system=args.source,
             data_dir=args.data_dir,
             output_dir=args.output_dir,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            stream=args.stream,
+            disk_cache=args.disk_cache,
+            output_format=args.output_format
         )
         
         # Extract data
@@ -589,7 +1074,7 @@ def main():
         logger.info("Extraction completed successfully")
         
     except Exception as e:
-        logger.error(f"Extraction failed: {str(e)}")
+        logger.error("Extraction failed: %s", e)
         raise
 
 
@@ -8,13 +8,147 @@ Patient, Encounter, Observation, and MedicationRequest.
 
 """
 
+import io
 import os
+import re
 import json
+import mmap
 import uuid
 import logging
 import argparse
-import datetime
-from typing import Dict, List, Any, Optional, Tuple
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from json.encoder import encode_basestring_ascii
+from typing import Dict, List, Any, BinaryIO, Callable, Iterable, Iterator, Optional, Tuple
+
+# orjson is optional; fall back to the stdlib json module when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson is optional; it is only needed for streaming transformation
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# zstandard is optional; it is only needed for compressed output
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Legacy dates are already ISO 8601 (YYYY-MM-DD), the format FHIR uses, so
+# transforms pass them through unchanged and map empty values to None. A
+# source with another date format needs a conversion step at those sites.
+
+# Files at least this large are memory-mapped for parsing instead of copied into a bytes object
+MMAP_THRESHOLD = 1 << 20
+
+# Buffer size for reading and writing large JSON files
+IO_BUFFER_SIZE = 1 << 20
+
+# Number of fallback resource IDs generated per block of random bytes
+ID_POOL_SIZE = 4096
+
+# Bundle entries serialized per call when writing resources held in memory
+BUNDLE_BATCH_SIZE = 1000
+
+# Records per worker task when streaming with more than one worker process
+STREAM_CHUNK_SIZE = 1000
+
+# FHIR profile and code system URLs
+_US_CORE_PATIENT = "http://hl7.org/fhir/us/core/StructureDefinition/us-core-patient"
+_US_CORE_ENCOUNTER = "http://hl7.org/fhir/us/core/StructureDefinition/us-core-encounter"
+_US_CORE_OBSERVATION_LAB = "http://hl7.org/fhir/us/core/StructureDefinition/us-core-observation-lab"
+_US_CORE_MEDICATION_REQUEST = "http://hl7.org/fhir/us/core/StructureDefinition/us-core-medicationrequest"
+_V2_0203 = "http://terminology.hl7.org/CodeSystem/v2-0203"
+_V3_ACT_CODE = "http://terminology.hl7.org/CodeSystem/v3-ActCode"
+_V3_PARTICIPATION_TYPE = "http://terminology.hl7.org/CodeSystem/v3-ParticipationType"
+_V3_OBSERVATION_INTERPRETATION = "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation"
+_OBSERVATION_CATEGORY = "http://terminology.hl7.org/CodeSystem/observation-category"
+_ICD_10_CM = "http://hl7.org/fhir/sid/icd-10-cm"
+_ICD_9_CM = "http://hl7.org/fhir/sid/icd-9-cm"
+_LOINC = "http://loinc.org"
+_UCUM = "http://unitsofmeasure.org"
+
+# Decimal literals accepted as numeric observation values
+_NUMERIC_VALUE = re.compile(r"\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*")
+
+
+def _profile_meta(profile: str) -> Dict[str, Any]:
+    """Build the meta element declaring a resource's profile."""
+    return {"profile": [profile]}
+
+
+def _laboratory_category() -> List[Dict[str, Any]]:
+    """Build the category element of a laboratory Observation."""
+    return [
+        {
+            "coding": [
+                {
+                    "system": _OBSERVATION_CATEGORY,
+                    "code": "laboratory",
+                    "display": "Laboratory"
+                }
+            ]
+        }
+    ]
+
+
+# Resource skeletons fixing the key order of each resource, with resourceType (and
+# the MedicationRequest intent) filled in. Transforms copy one and assign the
+# other fields, which is cheaper than building the full dict literal for every
+# record. Nested elements such as meta are built per resource rather than held
+# here, so no two resources share a mutable object.
+_PATIENT_TEMPLATE = {
+    "resourceType": "Patient",
+    "id": None,
+    "meta": None,
+    "identifier": None,
+    "active": None,
+    "name": None,
+    "gender": None,
+    "birthDate": None,
+    "deceasedBoolean": None
+}
+_ENCOUNTER_TEMPLATE = {
+    "resourceType": "Encounter",
+    "id": None,
+    "meta": None,
+    "identifier": None,
+    "status": None,
+    "class": None,
+    "type": None,
+    "subject": None,
+    "period": None
+}
+_OBSERVATION_TEMPLATE = {
+    "resourceType": "Observation",
+    "id": None,
+    "meta": None,
+    "identifier": None,
+    "status": None,
+    "category": None,
+    "code": None,
+    "subject": None,
+    "encounter": None,
+    "effectiveDateTime": None
+}
+_MEDICATION_REQUEST_TEMPLATE = {
+    "resourceType": "MedicationRequest",
+    "id": None,
+    "meta": None,
+    "identifier": None,
+    "status": None,
+    "intent": "order",
+    "medicationCodeableConcept": None,
+    "subject": None,
+    "authoredOn": None
+}
 
 # Configure logging
 logging.basicConfig(
@@ -27,13 +161,91 @@ logging.basicConfig(
 )
 logger = logging.getLogger("fhir_transformer")
 
+# Transformer instance owned by each worker process of a parallel transformation
+_worker_transformer = None
+
+
+def _open_output(file_path: str, compress: bool) -> BinaryIO:
+    """
+    Open an output file for buffered binary writing.
+    
+    Args:
+        file_path: Path of the file to write
+        compress: Compress the written data with zstd (requires zstandard)
+        
+    Returns:
+        Writable binary file object
+    """
+    raw = open(file_path, 'wb', buffering=IO_BUFFER_SIZE)
+    if not compress:
+        return raw
+    # Closing the compressing writer also closes the underlying file
+    return zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(raw)
+
+
+def _init_worker(input_dir: str, output_dir: str, source_system: str) -> None:
+    """Create the transformer used by a worker process."""
+    global _worker_transformer
+    _worker_transformer = EHRtoFHIRTransformer(input_dir, output_dir, source_system)
+
+
+def _apply_transform(transform: Callable[[Dict[str, Any]], Any],
+                     returns_list: bool,
+                     records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Transform legacy records into a flat list of FHIR resources.
+    
+    Args:
+        transform: Transform method to apply to each record
+        returns_list: Whether the transform returns a list of resources per record
+        records: Legacy records to transform
+        
+    Returns:
+        List of FHIR resources
+    """
+    if returns_list:
+        return [resource for record in records for resource in transform(record)]
+    return [transform(record) for record in records]
+
+
+def _transform_chunk(method_name: str, returns_list: bool, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Transform a chunk of records in a worker process."""
+    return _apply_transform(getattr(_worker_transformer, method_name), returns_list, records)
+
+
+def _serialize_chunk(method_name: str, returns_list: bool, records: List[Dict[str, Any]]) -> List[Tuple[str, bytes]]:
+    """Transform a chunk of records in a worker process and serialize each resource."""
+    dumps = _worker_transformer._dumps
+    return [
+        (resource["id"], dumps(resource))
+        for resource in _transform_chunk(method_name, returns_list, records)
+    ]
+
+
 class EHRtoFHIRTransformer:
     """Transforms legacy EHR data to FHIR format."""
     
+    # (entity type, FHIR resource type, transform method, whether it returns a list)
+    _ENTITY_TRANSFORMS = [
+        ("patients", "Patient", "transform_patient", False),
+        ("encounters", "Encounter", "transform_encounter", False),
+        ("observations", "Observation", "transform_observation", True),
+        ("medications", "MedicationRequest", "transform_medication", False)
+    ]
+    
+    # Supported output formats and the file extension used for each
+    OUTPUT_FORMATS = {"json": "json", "ndjson": "ndjson"}
+    
     def __init__(self, 
                  input_dir: str = "./extracted_data", 
                  output_dir: str = "./fhir_data",
-                 source_system: str = "unknown"):
+                 source_system: str = "unknown",
+                 workers: int = 1,
+                 output_format: str = "json",
+                 bundle: Optional[bool] = None,
+                 bundle_size: Optional[int] = None,
+                 pretty: bool = False,
+                 compress: bool = False):
         """
         Initialize the EHR to FHIR transformer.
         
@@ -41,15 +253,58 @@ class EHRtoFHIRTransformer:
             input_dir: Directory containing extracted legacy EHR data
             output_dir: Directory to save transformed FHIR data
             source_system: Name of the source EHR system
+            workers: Number of worker processes used by transform_all_data
+            output_format: Format of the resource files, "json" (one array per
+                file) or "ndjson" (one resource per line, as in FHIR bulk data)
+            bundle: Also write a Bundle containing all resources; defaults to True
+                for JSON output and False for NDJSON output, which is meant for
+                bulk import rather than transaction Bundles
+            bundle_size: Maximum number of entries per Bundle; when set, the
+                Bundle is split into bundle-0001.json, bundle-0002.json, ...
+            pretty: Indent JSON resource files for readability; files are
+                written compactly otherwise (the streaming path is always compact)
+            compress: Compress the output files with zstd, adding a .zst suffix
+                (requires zstandard)
         """
         self.input_dir = input_dir
         self.output_dir = output_dir
         self.source_system = source_system
+        self.workers = workers
+        
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.output_format = output_format
+        self.bundle = bundle if bundle is not None else output_format == "json"
+        
+        if bundle_size is not None and bundle_size < 1:
+            raise ValueError(f"Bundle size must be at least 1: {bundle_size}")
+        self.bundle_size = bundle_size
+        self.pretty = pretty
+        
+        if compress and zstandard is None:
+            logger.warning("zstandard is not installed; writing uncompressed output")
+            compress = False
+        self.compress = compress
+        self._output_suffix = ".zst" if compress else ""
+        
+        # Identifier system shared by every resource from this source
+        self._identifier_system = f"urn:oid:{source_system}"
+        
+        # Random bytes for fallback resource IDs, filled on first use
+        self._id_pool = b""
+        self._id_cursor = 0
+        
+        # Input file of each entity type
+        self._input_paths = {
+            entity_type: os.path.join(input_dir, f"{entity_type}.json")
+            for entity_type, _, _, _ in self._ENTITY_TRANSFORMS
+        }
+        
+        # Output file of each resource type, filled by _output_path
+        self._output_paths: Dict[str, str] = {}
         
         # Create output directory if it doesn't exist
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-            logger.info(f"Created output directory: {output_dir}")
+        os.makedirs(output_dir, exist_ok=True)
         
         # Load reference data for mapping
         self._load_reference_data()
@@ -82,6 +337,54 @@ class EHRtoFHIRTransformer:
             # Add more mappings as needed
         }
         
+        # Encounter type to FHIR ActCode class mapping
+        self.encounter_class_map = {
+            "Office Visit": "AMB",
+            "Outpatient": "AMB",
+            "Ambulatory": "AMB",
+            "Hospital Encounter": "IMP",
+            "Inpatient": "IMP",
+            "Emergency": "EMER",
+            "Surgery": "SS",
+            "Telehealth": "VR",
+            "Virtual": "VR",
+            "Home Visit": "HH",
+            "Nursing Home": "NONAC",
+            "Skilled Nursing": "NONAC",
+            "Urgent Care": "AMB"
+        }
+        
+        # Observation status mapping
+        self.observation_status_map = {
+            "final": "final",
+            "preliminary": "preliminary",
+            "corrected": "corrected",
+            "cancelled": "cancelled",
+            "entered-in-error": "entered-in-error"
+        }
+        
+        # Result status to observation interpretation code mapping (default "N", normal)
+        self.interpretation_map = {
+            "high": "H",
+            "low": "L",
+            "abnormal": "A"
+        }
+        
+        # Language name to BCP-47 code mapping
+        self.language_map = {
+            "English": "en",
+            "Spanish": "es",
+            "French": "fr",
+            "German": "de",
+            "Chinese": "zh",
+            "Japanese": "ja",
+            "Korean": "ko",
+            "Russian": "ru",
+            "Arabic": "ar",
+            "Hindi": "hi",
+            "Portuguese": "pt"
+        }
+        
         # Add more reference data mappings as needed
     
     def _load_json_data(self, entity_type: str) -> List[Dict[str, Any]]:
@@ -94,34 +397,68 @@ class EHRtoFHIRTransformer:
         Returns:
             List of entities loaded from JSON
         """
-        file_path = os.path.join(self.input_dir, f"{entity_type}.json")
+        file_path = self._input_paths[entity_type]
         
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                logger.info(f"Loaded {len(data)} {entity_type} from {file_path}")
-                return data
+            if orjson is not None:
+                with open(file_path, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                            data = orjson.loads(view)
+                    else:
+                        data = orjson.loads(f.read())
+            else:
+                with open(file_path, 'r', buffering=IO_BUFFER_SIZE) as f:
+                    data = json.load(f)
+            logger.info(f"Loaded {len(data)} {entity_type} from {file_path}")
+            return data
         except Exception as e:
             logger.error(f"Error loading {entity_type} data: {str(e)}")
             raise
     
-    def _format_date(self, date_str: Optional[str]) -> Optional[str]:
+    def _iter_json_data(self, entity_type: str) -> Iterator[Dict[str, Any]]:
         """
-        Format date strings to FHIR format.
+        Iterate over the records of a JSON file without loading it whole.
+        
+        Falls back to loading the file when ijson is not installed.
         
         Args:
-            date_str: Date string to format
+            entity_type: Type of entity to load (patients, encounters, etc.)
             
+        Yields:
+            Entity records in file order
+        """
+        if ijson is None:
+            yield from self._load_json_data(entity_type)
+            return
+        
+        file_path = self._input_paths[entity_type]
+        logger.info(f"Streaming {entity_type} from {file_path}")
+        
+        try:
+            with open(file_path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+                yield from ijson.items(f, 'item', use_float=True, buf_size=IO_BUFFER_SIZE)
+        except Exception as e:
+            logger.error(f"Error streaming {entity_type} data: {str(e)}")
+            raise
+    
+    def _new_id(self) -> str:
+        """
+        Generate a random UUID for a record without a source ID.
+        
+        Random bytes are read from the OS in blocks of ID_POOL_SIZE IDs rather
+        than once per ID.
+        
         Returns:
-            Formatted date string
+            UUID (version 4) string
         """
-        if not date_str:
-            return None
+        if self._id_cursor >= len(self._id_pool):
+            self._id_pool = os.urandom(16 * ID_POOL_SIZE)
+            self._id_cursor = 0
         
-        # FHIR uses ISO 8601 format (YYYY-MM-DD)
-        # Many legacy systems already use this format, so we may not need to change it
-        # If a different format is used, conversion logic would go here
-        return date_str
+        start = self._id_cursor
+        self._id_cursor = start + 16
+        return str(uuid.UUID(bytes=self._id_pool[start:start + 16], version=4))
     
     def transform_patient(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -133,108 +470,72 @@ class EHRtoFHIRTransformer:
         Returns:
             FHIR Patient resource
         """
+        # Bind the record's lookup method once; it is called for nearly every field
+        get = patient_data.get
+        
         # Generate a FHIR ID (you might want to use a deterministic method in practice)
-        fhir_id = f"Patient-{patient_data.get('patient_id', str(uuid.uuid4()))}"
+        fhir_id = f"Patient-{get('patient_id') or self._new_id()}"
         
         # Map gender code
-        gender_code = patient_data.get("gender", "U")
+        gender_code = get("gender", "U")
         fhir_gender = self.gender_map.get(gender_code, "unknown")
         
-        # Transform patient to FHIR format
-        fhir_patient = {
-            "resourceType": "Patient",
-            "id": fhir_id,
-            "meta": {
-                "profile": ["http://hl7.org/fhir/us/core/StructureDefinition/us-core-patient"]
-            },
-            "identifier": [
-                {
-                    "system": f"urn:oid:{self.source_system}",
-                    "value": patient_data.get("patient_id")
-                }
-            ],
-            "active": patient_data.get("active", True),
-            "name": [
-                {
-                    "use": "official",
-                    "family": patient_data.get("last_name", ""),
-                    "given": [
-                        patient_data.get("first_name", "")
-                    ]
-                }
-            ],
-            "gender": fhir_gender,
-            "birthDate": self._format_date(patient_data.get("birth_date")),
-            "deceasedBoolean": patient_data.get("deceased", False)
+        # Source system identifier, plus the MRN if present
+        identifier = {
+            "system": self._identifier_system,
+            "value": get("patient_id")
         }
+        mrn = get("mrn")
+        if mrn:
+            mrn_type = {
+                "coding": [
+                    {
+                        "system": _V2_0203,
+                        "code": "MR",
+                        "display": "Medical Record Number"
+                    }
+                ]
+            }
+            identifiers = [identifier, {"system": _V2_0203, "type": mrn_type, "value": mrn}]
+        else:
+            identifiers = [identifier]
         
-        # Add middle name if present
-        middle_name = patient_data.get("middle_name")
-        if middle_name:
-            fhir_patient["name"][0]["given"].append(middle_name)
+        # Given names, with the middle name if present
+        first_name = get("first_name", "")
+        middle_name = get("middle_name")
+        given = [first_name, middle_name] if middle_name else [first_name]
         
-        # Add MRN if present
-        mrn = patient_data.get("mrn")
-        if mrn:
-            fhir_patient["identifier"].append({
-                "system": "http://terminology.hl7.org/CodeSystem/v2-0203",
-                "type": {
-                    "coding": [
-                        {
-                            "system": "http://terminology.hl7.org/CodeSystem/v2-0203",
-                            "code": "MR",
-                            "display": "Medical Record Number"
-                        }
-                    ]
-                },
-                "value": mrn
-            })
+        # Transform patient to FHIR format
+        fhir_patient = _PATIENT_TEMPLATE.copy()
+        fhir_patient["id"] = fhir_id
+        fhir_patient["meta"] = _profile_meta(_US_CORE_PATIENT)
+        fhir_patient["identifier"] = identifiers
+        fhir_patient["active"] = get("active", True)
+        fhir_patient["name"] = [
+            {
+                "use": "official",
+                "family": get("last_name", ""),
+                "given": given
+            }
+        ]
+        fhir_patient["gender"] = fhir_gender
+        fhir_patient["birthDate"] = get("birth_date") or None
+        fhir_patient["deceasedBoolean"] = get("deceased", False)
         
         # Add address if present
-        if "address" in patient_data:
-            addr = patient_data["address"]
-            fhir_address = {
-                "use": "home",
-                "line": []
-            }
-            
-            if addr.get("line1"):
-                fhir_address["line"].append(addr["line1"])
-            if addr.get("line2"):
-                fhir_address["line"].append(addr["line2"])
-            if addr.get("city"):
-                fhir_address["city"] = addr["city"]
-            if addr.get("state_code"):
-                fhir_address["state"] = addr["state_code"]
-            elif addr.get("state"):
-                fhir_address["state"] = addr["state"]
-            if addr.get("postal_code"):
-                fhir_address["postalCode"] = addr["postal_code"]
-            if addr.get("country"):
-                fhir_address["country"] = addr["country"]
-            
-            fhir_patient["address"] = [fhir_address]
+        addr = get("address")
+        if addr is not None:
+            fhir_patient["address"] = [self._transform_address(addr)]
         
         # Add telecom if present
-        telecom = []
-        if "contact" in patient_data:
-            if patient_data["contact"].get("phone"):
-                telecom.append({
-                    "system": "phone",
-                    "value": patient_data["contact"]["phone"],
-                    "use": "home"
-                })
-            if patient_data["contact"].get("email"):
-                telecom.append({
-                    "system": "email",
-                    "value": patient_data["contact"]["email"]
-                })
-        
-        if telecom:
-            fhir_patient["telecom"] = telecom
+        contact = get("contact")
+        if contact:
+            telecom = self._transform_contact(contact)
+            if telecom:
+                fhir_patient["telecom"] = telecom
         
         # Add preferred language if present
-        language = patient_data.get("preferred_language")
+        language = get("preferred_language")
         if language:
             fhir_patient["communication"] = [
                 {
@@ -254,6 +555,75 @@ class EHRtoFHIRTransformer:
         
         return fhir_patient
     
+    def _transform_address(self, addr: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Transform a legacy address to a FHIR Address.
+        
+        Args:
+            addr: Legacy address data
+            
+        Returns:
+            FHIR Address
+        """
+        get = addr.get
+        line1 = get("line1")
+        line2 = get("line2")
+        
+        if line1 and line2:
+            lines = [line1, line2]
+        elif line1 or line2:
+            lines = [line1 or line2]
+        else:
+            lines = []
+        
+        fhir_address = {
+            "use": "home",
+            "line": lines
+        }
+        
+        city = get("city")
+        if city:
+            fhir_address["city"] = city
+        state = get("state_code") or get("state")
+        if state:
+            fhir_address["state"] = state
+        postal_code = get("postal_code")
+        if postal_code:
+            fhir_address["postalCode"] = postal_code
+        country = get("country")
+        if country:
+            fhir_address["country"] = country
+        
+        return fhir_address
+    
+    def _transform_contact(self, contact: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Transform legacy contact details to FHIR ContactPoints.
+        
+        Args:
+            contact: Legacy contact data
+            
+        Returns:
+            List of FHIR ContactPoints (empty if no phone or email)
+        """
+        telecom = []
+        
+        phone = contact.get("phone")
+        if phone:
+            telecom.append({
+                "system": "phone",
+                "value": phone,
+                "use": "home"
+            })
+        email = contact.get("email")
+        if email:
+            telecom.append({
+                "system": "email",
+                "value": email
+            })
+        
+        return telecom
+    
     def _map_language_code(self, language: str) -> str:
         """
         Map language name to BCP-47 language code.
@@ -264,21 +634,7 @@ class EHRtoFHIRTransformer:
         Returns:
             BCP-47 language code
         """
-        language_map = {
-            "English": "en",
-            "Spanish": "es",
-            "French": "fr",
-            "German": "de",
-            "Chinese": "zh",
-            "Japanese": "ja",
-            "Korean": "ko",
-            "Russian": "ru",
-            "Arabic": "ar",
-            "Hindi": "hi",
-            "Portuguese": "pt"
-        }
-        
-        return language_map.get(language, "en")
+        return self.language_map.get(language, "en")
     
     def transform_encounter(self, encounter_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -290,51 +646,50 @@ class EHRtoFHIRTransformer:
         Returns:
             FHIR Encounter resource
         """
+        get = encounter_data.get
+        
         # Generate a FHIR ID
-        fhir_id = f"Encounter-{encounter_data.get('encounter_id', str(uuid.uuid4()))}"
+        fhir_id = f"Encounter-{get('encounter_id') or self._new_id()}"
         
         # Map encounter status
-        status = encounter_data.get("status", "unknown")
+        status = get("status", "unknown")
         fhir_status = self.encounter_status_map.get(status, "unknown")
         
         # Transform encounter to FHIR format
-        fhir_encounter = {
-            "resourceType": "Encounter",
-            "id": fhir_id,
-            "meta": {
-                "profile": ["http://hl7.org/fhir/us/core/StructureDefinition/us-core-encounter"]
-            },
-            "identifier": [
-                {
-                    "system": f"urn:oid:{self.source_system}",
-                    "value": encounter_data.get("encounter_id")
-                }
-            ],
-            "status": fhir_status,
-            "class": {
-                "system": "http://terminology.hl7.org/CodeSystem/v3-ActCode",
-                "code": self._map_encounter_type_to_class(encounter_data.get("type", "AMB")),
-                "display": encounter_data.get("type", "Ambulatory")
-            },
-            "type": [
-                {
-                    "text": encounter_data.get("type", "Encounter")
-                }
-            ],
-            "subject": {
-                "reference": f"Patient/{encounter_data.get('patient_id')}"
-            },
-            "period": {
-                "start": self._format_date(encounter_data.get("encounter_date"))
+        fhir_encounter = _ENCOUNTER_TEMPLATE.copy()
+        fhir_encounter["id"] = fhir_id
+        fhir_encounter["meta"] = _profile_meta(_US_CORE_ENCOUNTER)
+        fhir_encounter["identifier"] = [
+            {
+                "system": self._identifier_system,
+                "value": get("encounter_id")
+            }
+        ]
+        fhir_encounter["status"] = fhir_status
+        fhir_encounter["class"] = {
+            "system": _V3_ACT_CODE,
+            "code": self._map_encounter_type_to_class(get("type", "AMB")),
+            "display": get("type", "Ambulatory")
+        }
+        fhir_encounter["type"] = [
+            {
+                "text": get("type", "Encounter")
             }
+        ]
+        fhir_encounter["subject"] = {
+            "reference": f"Patient/{get('patient_id')}"
+        }
+        fhir_encounter["period"] = {
+            "start": get("encounter_date") or None
         }
         
         # Add end date if present
-        if encounter_data.get("discharge_date"):
-            fhir_encounter["period"]["end"] = self._format_date(encounter_data["discharge_date"])
+        discharge_date = get("discharge_date")
+        if discharge_date:
+            fhir_encounter["period"]["end"] = discharge_date
         
         # Add diagnoses if present
-        if encounter_data.get("diagnoses"):
+        if get("diagnoses"):
             fhir_encounter["diagnosis"] = []
             for i, diagnosis in enumerate(encounter_data["diagnoses"]):
                 fhir_diagnosis = {
@@ -346,9 +701,9 @@ class EHRtoFHIRTransformer:
                 
                 # Add coding if code is available
                 if diagnosis.get("code"):
-                    coding_system = "http://hl7.org/fhir/sid/icd-10-cm"
+                    coding_system = _ICD_10_CM
                     if diagnosis.get("type") == "ICD-9":
-                        coding_system = "http://hl7.org/fhir/sid/icd-9-cm"
+                        coding_system = _ICD_9_CM
                     
                     fhir_diagnosis["condition"]["coding"] = [
                         {
@@ -361,7 +716,7 @@ class EHRtoFHIRTransformer:
                 fhir_encounter["diagnosis"].append(fhir_diagnosis)
         
         # Add location if present
-        if encounter_data.get("location"):
+        if get("location"):
             fhir_encounter["location"] = [
                 {
                     "location": {
@@ -371,7 +726,7 @@ class EHRtoFHIRTransformer:
             ]
         
         # Add provider if present
-        if encounter_data.get("provider"):
+        if get("provider"):
             provider = encounter_data["provider"]
             fhir_encounter["participant"] = [
                 {
@@ -379,7 +734,7 @@ class EHRtoFHIRTransformer:
                         {
                             "coding": [
                                 {
-                                    "system": "http://terminology.hl7.org/CodeSystem/v3-ParticipationType",
+                                    "system": _V3_PARTICIPATION_TYPE,
                                     "code": "PPRF",
                                     "display": "Primary Performer"
                                 }
@@ -393,7 +748,7 @@ class EHRtoFHIRTransformer:
             ]
         
         # Add reason for visit if present
-        if encounter_data.get("chief_complaint"):
+        if get("chief_complaint"):
             fhir_encounter["reasonCode"] = [
                 {
                     "text": encounter_data["chief_complaint"]
@@ -412,24 +767,7 @@ class EHRtoFHIRTransformer:
         Returns:
             FHIR class code
         """
-        # Map common encounter types to FHIR ActCode
-        encounter_class_map = {
-            "Office Visit": "AMB",
-            "Outpatient": "AMB",
-            "Ambulatory": "AMB",
-            "Hospital Encounter": "IMP",
-            "Inpatient": "IMP",
-            "Emergency": "EMER",
-            "Surgery": "SS",
-            "Telehealth": "VR",
-            "Virtual": "VR",
-            "Home Visit": "HH",
-            "Nursing Home": "NONAC",
-            "Skilled Nursing": "NONAC",
-            "Urgent Care": "AMB"
-        }
-        
-        return encounter_class_map.get(encounter_type, "AMB")
+        return self.encounter_class_map.get(encounter_type, "AMB")
     
     def transform_observation(self, observation_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -441,93 +779,94 @@ class EHRtoFHIRTransformer:
         Returns:
             List of FHIR Observation resources
         """
+        get = observation_data.get
+        
+        # Fields shared by every resource produced from this observation
+        observation_id = get("observation_id")
+        patient_id = get("patient_id")
+        encounter_id = get("encounter_id")
+        test_code = get("test_code")
+        test_name = get("test_name", "Unknown Test")
+        performer = get("performer")
+        fhir_status = self._map_observation_status(get("status", "final"))
+        effective_date = get("observation_date") or None
+        
         fhir_observations = []
         
         # Each component in the results array becomes a separate FHIR Observation
-        if "results" in observation_data and observation_data["results"]:
-            for i, result in enumerate(observation_data["results"]):
+        results = get("results")
+        if results:
+            result_count = len(results)
+            fhir_observations = [None] * result_count
+            
+            id_prefix = f"Observation-{observation_id or self._new_id()}"
+            patient_reference = f"Patient/{patient_id}"
+            encounter_reference = f"Encounter/{encounter_id}"
+            interpretation_map = self.interpretation_map
+            
+            for i in range(result_count):
+                result = results[i]
+                
                 # Generate a FHIR ID
-                fhir_id = f"Observation-{observation_data.get('observation_id', str(uuid.uuid4()))}-{i}"
+                fhir_id = f"{id_prefix}-{i}"
                 
                 # Transform observation to FHIR format
-                fhir_observation = {
-                    "resourceType": "Observation",
-                    "id": fhir_id,
-                    "meta": {
-                        "profile": ["http://hl7.org/fhir/us/core/StructureDefinition/us-core-observation-lab"]
-                    },
-                    "identifier": [
-                        {
-                            "system": f"urn:oid:{self.source_system}",
-                            "value": f"{observation_data.get('observation_id')}-{i}"
-                        }
-                    ],
-                    "status": self._map_observation_status(observation_data.get("status", "final")),
-                    "category": [
-                        {
-                            "coding": [
-                                {
-                                    "system": "http://terminology.hl7.org/CodeSystem/observation-category",
-                                    "code": "laboratory",
-                                    "display": "Laboratory"
-                                }
-                            ]
-                        }
-                    ],
-                    "code": {
-                        "text": result.get("component", observation_data.get("test_name", "Unknown Test"))
-                    },
-                    "subject": {
-                        "reference": f"Patient/{observation_data.get('patient_id')}"
-                    },
-                    "encounter": {
-                        "reference": f"Encounter/{observation_data.get('encounter_id')}"
-                    },
-                    "effectiveDateTime": self._format_date(observation_data.get("observation_date"))
+                fhir_observation = _OBSERVATION_TEMPLATE.copy()
+                fhir_observation["id"] = fhir_id
+                fhir_observation["meta"] = _profile_meta(_US_CORE_OBSERVATION_LAB)
+                fhir_observation["identifier"] = [
+                    {
+                        "system": self._identifier_system,
+                        "value": f"{observation_id}-{i}"
+                    }
+                ]
+                fhir_observation["status"] = fhir_status
+                fhir_observation["category"] = _laboratory_category()
+                fhir_observation["code"] = {
+                    "text": result.get("component", test_name)
                 }
+                fhir_observation["subject"] = {
+                    "reference": patient_reference
+                }
+                fhir_observation["encounter"] = {
+                    "reference": encounter_reference
+                }
+                fhir_observation["effectiveDateTime"] = effective_date
                 
                 # Add test code if available
-                if observation_data.get("test_code"):
+                if test_code:
                     fhir_observation["code"]["coding"] = [
                         {
-                            "system": "http://loinc.org",
-                            "code": observation_data["test_code"],
-                            "display": observation_data.get("test_name", "Unknown Test")
+                            "system": _LOINC,
+                            "code": test_code,
+                            "display": test_name
                         }
                     ]
                 
                 # Add value based on result
                 if "value" in result:
-                    # Try to convert to numeric if possible
-                    try:
-                        numeric_value = float(result["value"])
+                    value = result["value"]
+                    # Use a quantity for numbers and numeric strings, otherwise a string
+                    if isinstance(value, (int, float)) or (isinstance(value, str) and _NUMERIC_VALUE.fullmatch(value)):
                         fhir_observation["valueQuantity"] = {
-                            "value": numeric_value,
+                            "value": float(value),
                             "unit": result.get("unit", ""),
-                            "system": "http://unitsofmeasure.org",
+                            "system": _UCUM,
                             "code": result.get("unit", "")
                         }
-                    except (ValueError, TypeError):
-                        # If not numeric, use string
-                        fhir_observation["valueString"] = result["value"]
+                    else:
+                        fhir_observation["valueString"] = value
                 
                 # Add interpretation if available
                 if "status" in result:
-                    interpretation_code = "N"  # Normal
-                    if result["status"] == "high":
-                        interpretation_code = "H"
-                    elif result["status"] == "low":
-                        interpretation_code = "L"
-                    elif result["status"] == "abnormal":
-                        interpretation_code = "A"
-                    
+                    result_status = result["status"]
                     fhir_observation["interpretation"] = [
                         {
                             "coding": [
                                 {
-                                    "system": "http://terminology.hl7.org/CodeSystem/v3-ObservationInterpretation",
-                                    "code": interpretation_code,
-                                    "display": result["status"].capitalize()
+                                    "system": _V3_OBSERVATION_INTERPRETATION,
+                                    "code": interpretation_map.get(result_status, "N"),
+                                    "display": result_status.capitalize()
                                 }
                             ]
                         }
@@ -542,64 +881,52 @@ class EHRtoFHIRTransformer:
                     ]
                 
                 # Add performer if available
-                if observation_data.get("performer"):
+                if performer:
                     fhir_observation["performer"] = [
                         {
-                            "display": observation_data["performer"]
+                            "display": performer
                         }
                     ]
                 
-                fhir_observations.append(fhir_observation)
+                fhir_observations[i] = fhir_observation
         else:
             # If no results array, create a single observation
-            fhir_id = f"Observation-{observation_data.get('observation_id', str(uuid.uuid4()))}"
+            fhir_id = f"Observation-{observation_id or self._new_id()}"
             
-            fhir_observation = {
-                "resourceType": "Observation",
-                "id": fhir_id,
-                "meta": {
-                    "profile": ["http://hl7.org/fhir/us/core/StructureDefinition/us-core-observation-lab"]
-                },
-                "identifier": [
-                    {
-                        "system": f"urn:oid:{self.source_system}",
-                        "value": observation_data.get('observation_id')
-                    }
-                ],
-                "status": self._map_observation_status(observation_data.get("status", "final")),
-                "category": [
-                    {
-                        "coding": [
-                            {
-                                "system": "http://terminology.hl7.org/CodeSystem/observation-category",
-                                "code": "laboratory",
-                                "display": "Laboratory"
-                            }
-                        ]
-                    }
-                ],
-                "code": {
-                    "text": observation_data.get("test_name", "Unknown Test")
-                },
-                "subject": {
-                    "reference": f"Patient/{observation_data.get('patient_id')}"
-                },
-                "effectiveDateTime": self._format_date(observation_data.get("observation_date"))
+            fhir_observation = _OBSERVATION_TEMPLATE.copy()
+            fhir_observation["id"] = fhir_id
+            fhir_observation["meta"] = _profile_meta(_US_CORE_OBSERVATION_LAB)
+            fhir_observation["identifier"] = [
+                {
+                    "system": self._identifier_system,
+                    "value": observation_id
+                }
+            ]
+            fhir_observation["status"] = fhir_status
+            fhir_observation["category"] = _laboratory_category()
+            fhir_observation["code"] = {
+                "text": test_name
+            }
+            fhir_observation["subject"] = {
+                "reference": f"Patient/{patient_id}"
             }
+            fhir_observation["effectiveDateTime"] = effective_date
             
             # Add encounter if available
-            if observation_data.get("encounter_id"):
+            if encounter_id:
                 fhir_observation["encounter"] = {
-                    "reference": f"Encounter/{observation_data['encounter_id']}"
+                    "reference": f"Encounter/{encounter_id}"
                 }
+            else:
+                del fhir_observation["encounter"]
             
             # Add test code if available
-            if observation_data.get("test_code"):
+            if test_code:
                 fhir_observation["code"]["coding"] = [
                     {
-                        "system": "http://loinc.org",
-                        "code": observation_data["test_code"],
-                        "display": observation_data.get("test_name", "Unknown Test")
+                        "system": _LOINC,
+                        "code": test_code,
+                        "display": test_name
                     }
                 ]
             
@@ -617,15 +944,7 @@ class EHRtoFHIRTransformer:
         Returns:
             FHIR observation status
         """
-        status_map = {
-            "final": "final",
-            "preliminary": "preliminary",
-            "corrected": "corrected",
-            "cancelled": "cancelled",
-            "entered-in-error": "entered-in-error"
-        }
-        
-        return status_map.get(status, "unknown")
+        return self.observation_status_map.get(status, "unknown")
     
     def transform_medication(self, medication_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -637,82 +956,81 @@ class EHRtoFHIRTransformer:
         Returns:
             FHIR MedicationRequest resource
         """
+        get = medication_data.get
+        
         # Generate a FHIR ID
-        fhir_id = f"MedicationRequest-{medication_data.get('medication_id', str(uuid.uuid4()))}"
+        fhir_id = f"MedicationRequest-{get('medication_id') or self._new_id()}"
         
         # Map medication status
-        status = medication_data.get("status", "active")
+        status = get("status", "active")
         fhir_status = self.medication_status_map.get(status, "active")
         
         # Transform medication to FHIR format
-        fhir_medication = {
-            "resourceType": "MedicationRequest",
-            "id": fhir_id,
-            "meta": {
-                "profile": ["http://hl7.org/fhir/us/core/StructureDefinition/us-core-medicationrequest"]
-            },
-            "identifier": [
-                {
-                    "system": f"urn:oid:{self.source_system}",
-                    "value": medication_data.get("medication_id")
-                }
-            ],
-            "status": fhir_status,
-            "intent": "order",
-            "medicationCodeableConcept": {
-                "text": medication_data.get("medication_name", "Unknown Medication")
-            },
-            "subject": {
-                "reference": f"Patient/{medication_data.get('patient_id')}"
-            },
-            "authoredOn": self._format_date(medication_data.get("prescription_date"))
+        fhir_medication = _MEDICATION_REQUEST_TEMPLATE.copy()
+        fhir_medication["id"] = fhir_id
+        fhir_medication["meta"] = _profile_meta(_US_CORE_MEDICATION_REQUEST)
+        fhir_medication["identifier"] = [
+            {
+                "system": self._identifier_system,
+                "value": get("medication_id")
+            }
+        ]
+        fhir_medication["status"] = fhir_status
+        fhir_medication["medicationCodeableConcept"] = {
+            "text": get("medication_name", "Unknown Medication")
         }
+        fhir_medication["subject"] = {
+            "reference": f"Patient/{get('patient_id')}"
+        }
+        fhir_medication["authoredOn"] = get("prescription_date") or None
         
         # Add encounter if available
-        if medication_data.get("encounter_id"):
+        if get("encounter_id"):
             fhir_medication["encounter"] = {
                 "reference": f"Encounter/{medication_data['encounter_id']}"
             }
         
-        # Add dosage instructions
+        # Add dosage instructions, joining only the parts that are present
+        dose = get("dose")
+        route = get("route")
         dosage_instruction = {
-            "text": f"{medication_data.get('dose', '')} {medication_data.get('route', '')} {medication_data.get('frequency', '')}"
+            "text": " ".join([str(part) for part in (dose, route, get("frequency")) if part])
         }
         
         # Add route if available
-        if medication_data.get("route"):
+        if route:
             dosage_instruction["route"] = {
-                "text": medication_data["route"]
+                "text": route
             }
         
         # Add dose if available
-        if medication_data.get("dose"):
+        if dose:
             dosage_instruction["doseAndRate"] = [
                 {
-                    "text": medication_data["dose"]
+                    "text": dose
                 }
             ]
         
         fhir_medication["dosageInstruction"] = [dosage_instruction]
         
         # Add prescriber if available
-        if medication_data.get("prescriber"):
+        if get("prescriber"):
             fhir_medication["requester"] = {
                 "display": medication_data["prescriber"]
             }
         
         # Add dispense request (refills, duration)
-        if medication_data.get("refills") is not None or medication_data.get("duration_days"):
+        if get("refills") is not None or get("duration_days"):
             dispense_request = {}
             
-            if medication_data.get("refills") is not None:
+            if get("refills") is not None:
                 dispense_request["numberOfRepeatsAllowed"] = medication_data["refills"]
             
-            if medication_data.get("duration_days"):
+            if get("duration_days"):
                 dispense_request["expectedSupplyDuration"] = {
                     "value": medication_data["duration_days"],
                     "unit": "day",
-                    "system": "http://unitsofmeasure.org",
+                    "system": _UCUM,
                     "code": "d"
                 }
             
@@ -729,100 +1047,497 @@ class EHRtoFHIRTransformer:
         """
         logger.info("Starting transformation of all data to FHIR format")
         
-        # Load legacy data
-        patients = self._load_json_data("patients")
-        encounters = self._load_json_data("encounters")
-        observations = self._load_json_data("observations")
-        medications = self._load_json_data("medications")
+        if self.workers > 1:
+            fhir_data = self._transform_in_parallel()
+        else:
+            fhir_data = {
+                resource_type: self.transform_entity_type(entity_type)
+                for entity_type, resource_type, _, _ in self._ENTITY_TRANSFORMS
+            }
         
-        # Transform data
-        fhir_patients = []
-        for patient in patients:
-            fhir_patient = self.transform_patient(patient)
-            fhir_patients.append(fhir_patient)
+        logger.info(f"Transformed {len(fhir_data['Patient'])} patients, {len(fhir_data['Encounter'])} encounters, "
+                  f"{len(fhir_data['Observation'])} observations, and "
+                  f"{len(fhir_data['MedicationRequest'])} medication requests")
+        
+        return fhir_data
+    
+    def transform_entity_type(self, entity_type: str) -> List[Dict[str, Any]]:
+        """
+        Transform all legacy records of one entity type to FHIR format.
         
-        fhir_encounters = []
-        for encounter in encounters:
-            fhir_encounter = self.transform_encounter(encounter)
-            fhir_encounters.append(fhir_encounter)
+        Entity types are transformed independently of each other, so each call
+        can run in its own process.
         
-        fhir_observations = []
-        for observation in observations:
-            # Each observation may generate multiple FHIR observations
-            obs_resources = self.transform_observation(observation)
-            fhir_observations.extend(obs_resources)
-        
-        fhir_medications = []
-        for medication in medications:
-            fhir_medication = self.transform_medication(medication)
-            fhir_medications.append(fhir_medication)
-        
-        # Build complete FHIR dataset
-        fhir_data = {
-            "Patient": fhir_patients,
-            "Encounter": fhir_encounters,
-            "Observation": fhir_observations,
-            "MedicationRequest": fhir_medications
-        }
+        Args:
+            entity_type: Type of entity to transform (patients, encounters, etc.)
+            
+        Returns:
+            List of FHIR resources
+        """
+        for known_type, _, method_name, returns_list in self._ENTITY_TRANSFORMS:
+            if known_type == entity_type:
+                # Feed the input file straight into the transform, so the legacy
+                # records are never all resident when ijson is installed
+                return _apply_transform(getattr(self, method_name), returns_list,
+                                        self._iter_json_data(entity_type))
+        
+        raise ValueError(f"Unsupported entity type: {entity_type}")
+    
+    def _transform_in_parallel(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Transform legacy data across a pool of worker processes.
+        
+        Each entity list is split into chunks that are transformed independently;
+        results are reassembled in input order.
         
-        logger.info(f"Transformed {len(fhir_patients)} patients, {len(fhir_encounters)} encounters, "
-                  f"{len(fhir_observations)} observations, and {len(fhir_medications)} medication requests")
+        Returns:
+            Dictionary containing all transformed FHIR resources
+        """
+        logger.info(f"Transforming with {self.workers} worker processes")
+        
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.input_dir, self.output_dir, self.source_system)) as executor:
+            # Submit every chunk of every entity type before collecting any results
+            futures = {}
+            for entity_type, resource_type, method_name, returns_list in self._ENTITY_TRANSFORMS:
+                records = self._load_json_data(entity_type)
+                chunk_size = max(1, -(-len(records) // self.workers))
+                futures[resource_type] = [
+                    executor.submit(_transform_chunk, method_name, returns_list, records[i:i + chunk_size])
+                    for i in range(0, len(records), chunk_size)
+                ]
+            
+            fhir_data = {}
+            for resource_type, chunk_futures in futures.items():
+                resources = []
+                for future in chunk_futures:
+                    resources.extend(future.result())
+                fhir_data[resource_type] = resources
         
         return fhir_data
     
+    def stream_transform_and_save(self) -> Dict[str, int]:
+        """
+        Transform and save all legacy EHR data in a single streaming pass.
+        
+        Each input record is transformed and written straight to its resource
+        file and to the Bundle, so no full list of records or resources is ever
+        held in memory. Input files are streamed with ijson when it is installed.
+        With more than one worker, chunks of records are transformed and
+        serialized in worker processes and written back in input order.
+        
+        Returns:
+            Number of resources written per resource type
+        """
+        logger.info("Starting streaming transformation of all data to FHIR format")
+        
+        ndjson = self.output_format == "ndjson"
+        counts = {}
+        bundle_writer = (_BundleWriter(self.output_dir, self._dumps, self.bundle_size, self.compress)
+                         if self.bundle else None)
+        executor = None
+        if self.workers > 1:
+            logger.info(f"Transforming with {self.workers} worker processes")
+            executor = ProcessPoolExecutor(max_workers=self.workers,
+                                           initializer=_init_worker,
+                                           initargs=(self.input_dir, self.output_dir, self.source_system))
+        try:
+            for entity_type, resource_type, method_name, returns_list in self._ENTITY_TRANSFORMS:
+                filename = self._output_path(resource_type)
+                entry_prefix = _BundleWriter.entry_prefix(resource_type)
+                count = 0
+                with _open_output(filename, self.compress) as out:
+                    # Bind the per-resource write methods once for the hot loop
+                    write = out.write
+                    write_entry = bundle_writer.write if bundle_writer is not None else None
+                    
+                    if not ndjson:
+                        write(b"[")
+                    for resource_id, resource_json in self._iter_serialized(entity_type, method_name,
+                                                                            returns_list, executor):
+                        if ndjson:
+                            write(resource_json + b"\n")
+                        else:
+                            write(b",\n" if count else b"\n")
+                            write(resource_json)
+                        count += 1
+                        
+                        if write_entry is not None:
+                            write_entry(entry_prefix, resource_id, resource_json)
+                    if not ndjson:
+                        write(b"\n]")
+                
+                counts[resource_type] = count
+                logger.info(f"Saved {count} {resource_type} resources to {filename}")
+        except BaseException:
+            if bundle_writer is not None:
+                bundle_writer.discard()
+            raise
+        else:
+            if bundle_writer is not None:
+                bundle_writer.close()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        if bundle_writer is not None:
+            self._log_bundles(bundle_writer.paths)
+        return counts
+    
+    def _iter_serialized(self,
+                         entity_type: str,
+                         method_name: str,
+                         returns_list: bool,
+                         executor: Optional[ProcessPoolExecutor]) -> Iterator[Tuple[str, bytes]]:
+        """
+        Transform the records of one entity type and serialize each resource.
+        
+        Args:
+            entity_type: Type of entity to transform
+            method_name: Name of the transform method
+            returns_list: Whether the transform returns a list of resources per record
+            executor: Worker pool to transform chunks of records in, or None to
+                transform in this process
+            
+        Yields:
+            Tuples of (resource ID, compact JSON bytes) in input order
+        """
+        records = self._iter_json_data(entity_type)
+        
+        if executor is None:
+            transform = getattr(self, method_name)
+            for record in records:
+                resources = transform(record) if returns_list else (transform(record),)
+                for resource in resources:
+                    yield resource["id"], self._dumps(resource)
+            return
+        
+        # Keep a bounded number of chunks in flight so memory stays proportional
+        # to the number of workers rather than to the input size
+        pending = deque()
+        max_pending = self.workers * 2
+        while True:
+            chunk = list(islice(records, STREAM_CHUNK_SIZE))
+            if chunk:
+                pending.append(executor.submit(_serialize_chunk, method_name, returns_list, chunk))
+            if pending and (len(pending) >= max_pending or not chunk):
+                yield from pending.popleft().result()
+            elif not chunk:
+                return
+    
+    def _output_path(self, resource_type: str) -> str:
+        """
+        Get the path of the output file for a resource type.
+        
+        Args:
+            resource_type: FHIR resource type
+            
+        Returns:
+            Path of the resource file, including the format extension and any
+            compression suffix
+        """
+        file_path = self._output_paths.get(resource_type)
+        if file_path is None:
+            extension = self.OUTPUT_FORMATS[self.output_format]
+            file_path = os.path.join(self.output_dir, f"{resource_type}.{extension}{self._output_suffix}")
+            self._output_paths[resource_type] = file_path
+        return file_path
+    
+    @staticmethod
+    def _dumps(data: Any) -> bytes:
+        """Serialize data to compact JSON bytes."""
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data).encode("utf-8")
+    
+    def _write_json(self, file_path: str, data: Any) -> None:
+        """
+        Write data to a JSON file, indented if pretty output was requested.
+        
+        Args:
+            file_path: Path of the file to write
+            data: The data to serialize
+        """
+        if orjson is not None:
+            option = orjson.OPT_NON_STR_KEYS
+            if self.pretty:
+                option |= orjson.OPT_INDENT_2
+            with _open_output(file_path, self.compress) as f:
+                f.write(orjson.dumps(data, option=option))
+        else:
+            with io.TextIOWrapper(_open_output(file_path, self.compress), encoding='utf-8') as f:
+                json.dump(data, f, indent=2 if self.pretty else None)
+    
+    def _write_ndjson(self, file_path: str, records: List[Dict[str, Any]]) -> None:
+        """
+        Write records as newline-delimited JSON, one compact record per line.
+        
+        Args:
+            file_path: Path of the file to write
+            records: The records to serialize
+        """
+        if orjson is not None:
+            with _open_output(file_path, self.compress) as f:
+                for record in records:
+                    f.write(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS))
+        else:
+            with io.TextIOWrapper(_open_output(file_path, self.compress), encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record))
+                    f.write("\n")
+    
     def save_fhir_data(self, fhir_data: Dict[str, List[Dict[str, Any]]]) -> None:
         """
-        Save transformed FHIR data to JSON files.
+        Save transformed FHIR data to JSON or NDJSON files.
         
         Args:
             fhir_data: The FHIR data to save
         """
+        if not any(fhir_data.values()):
+            logger.warning("No resources were transformed; nothing to save")
+            return
+        
         # Save each resource type to a separate file
         for resource_type, resources in fhir_data.items():
-            filename = os.path.join(self.output_dir, f"{resource_type}.json")
-            with open(filename, 'w') as f:
-                json.dump(resources, f, indent=2)
+            filename = self._output_path(resource_type)
+            if self.output_format == "ndjson":
+                self._write_ndjson(filename, resources)
+            else:
+                self._write_json(filename, resources)
             logger.info(f"Saved {len(resources)} {resource_type} resources to {filename}")
         
-        # Create a FHIR Bundle containing all resources
-        bundle = self._create_fhir_bundle(fhir_data)
-        
-        # Save Bundle
-        bundle_file = os.path.join(self.output_dir, "bundle.json")
-        with open(bundle_file, 'w') as f:
-            json.dump(bundle, f, indent=2)
+        if not self.bundle:
+            return
         
-        logger.info(f"Saved FHIR Bundle to {bundle_file}")
+        # Save a FHIR Bundle containing all resources
+        self._log_bundles(self._write_bundle(fhir_data))
     
-    def _create_fhir_bundle(self, fhir_data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    def _write_bundle(self, fhir_data: Dict[str, List[Dict[str, Any]]]) -> List[str]:
         """
-        Create a FHIR Bundle containing all resources.
+        Write FHIR Bundles containing all resources.
+        
+        Entries are serialized and written in batches, so no Bundle or full
+        entry list is built in memory.
         
         Args:
             fhir_data: Dictionary of FHIR resources by type
             
         Returns:
-            FHIR Bundle resource
+            Paths of the Bundle files written
         """
-        entries = []
+        with _BundleWriter(self.output_dir, self._dumps, self.bundle_size, self.compress) as bundle_writer:
+            for resource_type, resources in fhir_data.items():
+                if not resources:
+                    continue
+                try:
+                    bundle_writer.write_resources(resource_type, resources)
+                except ValueError as e:
+                    logger.error(str(e))
+                    raise
+        
+        return bundle_writer.paths
+    
+    def _log_bundles(self, paths: List[str]) -> None:
+        """Log where the Bundle files were saved."""
+        if not paths:
+            logger.warning("No resources were transformed; no FHIR Bundle was written")
+        elif len(paths) == 1:
+            logger.info(f"Saved FHIR Bundle to {paths[0]}")
+        else:
+            logger.info(f"Saved {len(paths)} FHIR Bundles of up to {self.bundle_size} entries to {self.output_dir}")
+
+
+class _BundleWriter:
+    """
+    Writes serialized resources as the entries of transaction Bundles.
+    
+    Entries go to a single bundle.json unless max_entries is set, in which case
+    they are split across bundle-0001.json, bundle-0002.json, ... of at most
+    max_entries entries each, so they can be submitted to a FHIR server in
+    parallel.
+    
+    The id of each Bundle is a hash of the fullUrls of its entries, so
+    re-running the transformation on the same data yields the same Bundle ids
+    and a retried submission can be recognized as a duplicate. Because the
+    hash is only known once all entries are written, the id is the last
+    member of the Bundle.
+    
+    Bundles are written to .tmp files that close() moves into place, so a
+    failed transformation leaves no complete-looking Bundle behind; used as a
+    context manager, the temporary files are discarded instead if the block
+    raises.
+    """
+    
+    def __init__(self,
+                 output_dir: str,
+                 dumps: Callable[[Any], bytes],
+                 max_entries: Optional[int] = None,
+                 compress: bool = False):
+        """
+        Initialize the Bundle writer.
         
-        # Add all resources to the bundle
-        for resource_type, resources in fhir_data.items():
-            for resource in resources:
-                entries.append({
-                    "fullUrl": f"{resource_type}/{resource.get('id', '')}",
-                    "resource": resource
-                })
-        
-        # Create Bundle resource
-        bundle = {
+        Args:
+            output_dir: Directory to write the Bundle files to
+            dumps: Function serializing a value to compact JSON bytes
+            max_entries: Maximum number of entries per Bundle, or None for a single Bundle
+            compress: Compress the Bundle files with zstd, adding a .zst suffix
+        """
+        self.output_dir = output_dir
+        self.max_entries = max_entries
+        self.compress = compress
+        self.paths: List[str] = []
+        self._tmp_paths: List[str] = []
+        self._dumps = dumps
+        self._file = None
+        self._count = 0
+        self._hash = None
+    
+    def __enter__(self) -> "_BundleWriter":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+    
+    def _open(self) -> None:
+        """Start a new Bundle file and write its header."""
+        if self.max_entries:
+            path = os.path.join(self.output_dir, f"bundle-{len(self.paths) + 1:04d}.json")
+        else:
+            path = os.path.join(self.output_dir, "bundle.json")
+        if self.compress:
+            path += ".zst"
+        
+        header = self._dumps({
             "resourceType": "Bundle",
-            "id": f"bundle-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}",
-            "type": "transaction",
-            "entry": entries
-        }
+            "type": "transaction"
+        })
+        tmp_path = path + ".tmp"
+        self._file = _open_output(tmp_path, self.compress)
+        self._file.write(header[:-1] + b',"entry":[\n')
+        self.paths.append(path)
+        self._tmp_paths.append(tmp_path)
+        self._count = 0
+        self._hash = hashlib.blake2b(digest_size=8)
+    
+    def _finish(self) -> None:
+        """Close the entry array and the Bundle of the current file, adding its id."""
+        self._file.write(b'\n],"id":' + self._dumps(f"bundle-{self._hash.hexdigest()}") + b"}")
+        self._file.close()
+        self._file = None
+    
+    def _room(self) -> int:
+        """
+        Make sure a Bundle with room for another entry is open.
         
-        return bundle
+        The separator before the next entry is left to the caller, which writes
+        it together with the entry once the entry is fully serialized; an error
+        while serializing then leaves no dangling comma in the file.
+        
+        Returns:
+            Number of entries the current Bundle can still take
+        """
+        if self._file is not None and self._count == self.max_entries:
+            self._finish()
+        if self._file is None:
+            self._open()
+        
+        return self.max_entries - self._count if self.max_entries else BUNDLE_BATCH_SIZE
+    
+    @staticmethod
+    def entry_prefix(resource_type: str) -> bytes:
+        """
+        Serialize the constant start of the entries of a resource type.
+        
+        Args:
+            resource_type: FHIR resource type
+            
+        Returns:
+            The entry up to the resource id: {"fullUrl":"ResourceType/
+        """
+        return b'{"fullUrl":' + encode_basestring_ascii(resource_type + "/")[:-1].encode()
+    
+    def write(self, entry_prefix: bytes, resource_id: str, resource_json: bytes) -> None:
+        """
+        Add an entry for an already serialized resource.
+        
+        Args:
+            entry_prefix: Serialized start of the entry, from entry_prefix()
+            resource_id: Id of the resource
+            resource_json: The resource as compact JSON bytes
+        """
+        if not isinstance(resource_id, str):
+            raise ValueError(f"Cannot add resource without a string id to the Bundle: {resource_json.decode('utf-8')}")
+        # Escaped id and the closing quote of the fullUrl
+        id_json = encode_basestring_ascii(resource_id)[1:].encode()
+        self._room()
+        separator = b",\n" if self._count else b""
+        self._hash.update(entry_prefix)
+        self._hash.update(id_json)
+        self._file.write(b"".join((separator, entry_prefix, id_json, b',"resource":', resource_json, b"}")))
+        self._count += 1
+    
+    def write_resources(self, resource_type: str, resources: List[Dict[str, Any]]) -> None:
+        """
+        Add entries for a list of resources.
+        
+        Entries are serialized in batches of up to BUNDLE_BATCH_SIZE with one
+        dumps call per batch, so the per-entry work runs inside the serializer.
+        
+        Args:
+            resource_type: FHIR resource type of the resources
+            resources: The resources to add; each must have a string id
+        """
+        url_prefix = resource_type + "/"
+        entry_prefix = self.entry_prefix(resource_type)
+        position = 0
+        while position < len(resources):
+            batch = resources[position:position + min(self._room(), BUNDLE_BATCH_SIZE)]
+            for resource in batch:
+                # Every resource needs a string id to get a usable fullUrl
+                if not isinstance(resource.get("id"), str):
+                    raise ValueError(f"Cannot add {resource_type} resource without a string id to the Bundle: {resource}")
+            # Serialize the whole batch before touching the file or the hash
+            entry_urls = b"".join([
+                entry_prefix + encode_basestring_ascii(resource["id"])[1:].encode()
+                for resource in batch
+            ])
+            entries_json = self._dumps([
+                {"fullUrl": url_prefix + resource["id"], "resource": resource}
+                for resource in batch
+            ])
+            self._hash.update(entry_urls)
+            if self._count:
+                self._file.write(b",\n")
+            # Drop the enclosing brackets to splice the entries into the open array
+            self._file.write(entries_json[1:-1])
+            self._count += len(batch)
+            position += len(batch)
+    
+    def close(self) -> None:
+        """
+        Finish the current Bundle and move the Bundle files into place.
+        
+        No file is written if no entries were added.
+        """
+        if self._file is not None:
+            self._finish()
+        for tmp_path, path in zip(self._tmp_paths, self.paths):
+            os.replace(tmp_path, path)
+        self._tmp_paths = []
+    
+    def discard(self) -> None:
+        """Abandon the Bundles written so far, removing their temporary files."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for tmp_path in self._tmp_paths:
+            os.remove(tmp_path)
+        self._tmp_paths = []
+        self.paths = []
 
 
 def main():
@@ -831,6 +1546,14 @@ def main():
     parser.add_argument('--input-dir', default='./extracted_data', help='Directory containing extracted legacy EHR data')
     parser.add_argument('--output-dir', default='./fhir_data', help='Directory to save transformed FHIR data')
     parser.add_argument('--source-system', default='legacy_ehr', help='Name of the source EHR system')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes used to transform records')
+    parser.add_argument('--stream', action='store_true', help='Transform and write records one at a time instead of holding all resources in memory')
+    parser.add_argument('--output-format', choices=['json', 'ndjson'], default='json', help='Format of the FHIR resource files')
+    parser.add_argument('--bundle', dest='bundle', action='store_true', default=None, help='Write bundle.json (default for JSON output)')
+    parser.add_argument('--no-bundle', dest='bundle', action='store_false', help='Do not write bundle.json (default for NDJSON output)')
+    parser.add_argument('--bundle-size', type=int, help='Split the Bundle into files of at most this many entries')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON resource files')
+    parser.add_argument('--compress', action='store_true', help='Compress the output files with zstd (requires zstandard)')
     
     args = parser.parse_args()
     
@@ -839,19 +1562,29 @@ def main():
         transformer = EHRtoFHIRTransformer(
             input_dir=args.input_dir,
             output_dir=args.output_dir,
-            source_system=args.source_system
+            source_system=args.source_system,
+            workers=args.workers,
+            output_format=args.output_format,
+            bundle=args.bundle,
+            bundle_size=args.bundle_size,
+            pretty=args.pretty,
+            compress=args.compress
         )
         
-        # Transform data
-        fhir_data = transformer.transform_all_data()
-        
-        # Save transformed data
-        transformer.save_fhir_data(fhir_data)
+        if args.stream:
+            # Transform and save in a single pass
+            transformer.stream_transform_and_save()
+        else:
+            # Transform data
+            fhir_data = transformer.transform_all_data()
+            
+            # Save transformed data
+            transformer.save_fhir_data(fhir_data)
         
         logger.info("Transformation completed successfully")
         
-    except Exception as e:
-        logger.error(f"Transformation failed: {str(e)}")
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("Transformation failed: %s", e)
         raise
 
 
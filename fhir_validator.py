@@ -10,12 +10,22 @@ and compliance with healthcare data standards.
 
 import os
 import json
+import mmap
 import logging
 import argparse
 import re
+from collections import Counter, defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime
 from dataclasses import dataclass
-from typing import Dict, List, Any, Optional, Set, Tuple
+from itertools import chain
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Set, Tuple
+
+# orjson is optional; fall back to the stdlib json module when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(
@@ -28,6 +38,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger("fhir_validator")
 
+# Files at least this large are memory-mapped for parsing instead of copied into a bytes object
+MMAP_THRESHOLD = 1 << 20
+
+# Buffer size for reading and writing large JSON files
+IO_BUFFER_SIZE = 1 << 20
+
+# Allowed values of Patient fields checked in _validate_patient
+_PATIENT_GENDERS = frozenset(["male", "female", "other", "unknown"])
+_TELECOM_SYSTEMS = frozenset(["phone", "email", "fax", "pager", "url", "sms", "other"])
+
+# Observation.value[x] fields for the FHIR R4 value types
+_OBSERVATION_VALUE_KEYS = frozenset([
+    "valueQuantity", "valueCodeableConcept", "valueString", "valueBoolean", "valueInteger",
+    "valueRange", "valueRatio", "valueSampledData", "valueTime", "valueDateTime", "valuePeriod"
+])
+
+
+def _is_one_of(value: Any, allowed_values: frozenset) -> bool:
+    """Check a field value against a set of allowed codes; non-string values never match."""
+    # The isinstance check keeps unhashable JSON values (lists, objects) out of the set lookup
+    return isinstance(value, str) and value in allowed_values
+
+
+# Validator instance owned by each worker process of a parallel validation
+_worker_validator = None
+
 @dataclass
 class ValidationResult:
     """Class for storing validation results."""
@@ -64,13 +100,32 @@ class ValidationResult:
             return f"Invalid {self.resource_type}/{self.resource_id}: {', '.join(self.errors)}"
 
 
+def _dumps_indented(value: Any) -> bytes:
+    """Serialize a value as JSON indented by two spaces."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2)
+    return json.dumps(value, indent=2).encode()
+
+
+def _init_worker(fhir_dir: str, output_dir: str) -> None:
+    """Create the validator used by a worker process."""
+    global _worker_validator
+    _worker_validator = FHIRValidator(fhir_dir, output_dir)
+
+
+def _validate_chunk(resources: List[Dict[str, Any]]) -> List[ValidationResult]:
+    """Validate a chunk of resources in a worker process."""
+    return [_worker_validator.validate_resource(resource) for resource in resources]
+
+
 class FHIRValidator:
     """Validates FHIR resources against FHIR specification."""
     
     def __init__(self, 
                  fhir_dir: str = "./fhir_data",
                  output_dir: str = "./validation_results",
-                 fail_fast: bool = False):
+                 fail_fast: bool = False,
+                 workers: int = 1):
         """
         Initialize the FHIR validator.
         
@@ -78,10 +133,16 @@ class FHIRValidator:
             fhir_dir: Directory containing FHIR data
             output_dir: Directory to save validation results
             fail_fast: Whether to stop validation after the first error
+            workers: Number of worker processes used by validate_all_resources;
+                validation runs in-process when fail_fast is set
         """
         self.fhir_dir = fhir_dir
         self.output_dir = output_dir
         self.fail_fast = fail_fast
+        self.workers = workers
+        
+        # All FHIR data, loaded once and shared by validation and cross-validation
+        self._fhir_data_cache: Optional[Dict[str, List[Dict[str, Any]]]] = None
         
         # Create output directory if it doesn't exist
         if not os.path.exists(output_dir):
@@ -90,6 +151,19 @@ class FHIRValidator:
         
         # Load resource definitions
         self._load_resource_definitions()
+        
+        # Resource-specific checks by resource type
+        self._validators = {
+            "Patient": self._validate_patient,
+            "Encounter": self._validate_encounter,
+            "Observation": self._validate_observation,
+            "MedicationRequest": self._validate_medication_request
+        }
+        self._cross_validators = {
+            "Encounter": self._cross_validate_encounter,
+            "Observation": self._cross_validate_observation,
+            "MedicationRequest": self._cross_validate_medication_request
+        }
     
     def _load_resource_definitions(self) -> None:
         """Load FHIR resource definitions for validation."""
@@ -100,43 +174,103 @@ class FHIRValidator:
             "Observation": ["resourceType", "id", "status", "code", "subject"],
             "MedicationRequest": ["resourceType", "id", "status", "intent", "subject"]
         }
+        self._required_field_sets = {
+            resource_type: frozenset(fields) for resource_type, fields in self.required_fields.items()
+        }
+        # Error messages for missing fields are built once, so every result
+        # reporting the same missing field shares one string
+        self._missing_field_messages = {
+            field: f"Missing required field: {field}"
+            for fields in self.required_fields.values()
+            for field in fields
+        }
         
         # Define allowed values for enumerated fields
-        self.value_sets = {
+        value_sets = {
             "Encounter.status": ["planned", "arrived", "triaged", "in-progress", "onleave", "finished", "cancelled"],
             "Observation.status": ["registered", "preliminary", "final", "amended", "corrected", "cancelled", "entered-in-error", "unknown"],
             "MedicationRequest.status": ["active", "on-hold", "cancelled", "completed", "entered-in-error", "stopped", "draft", "unknown"],
             "MedicationRequest.intent": ["proposal", "plan", "order", "original-order", "reflex-order", "filler-order", "instance-order", "option"]
         }
+        self.value_sets = {field_path: frozenset(values) for field_path, values in value_sets.items()}
         
-        # Define regex patterns for common fields
+        # Group the enumerated fields by resource type once, as (field name, allowed
+        # values, allowed values text) with the text listing the values in the order above
+        self._value_set_plan: Dict[str, List[Tuple[str, frozenset, str]]] = {}
+        for field_path, values in value_sets.items():
+            resource_type, field_name = field_path.split(".", 1)
+            self._value_set_plan.setdefault(resource_type, []).append(
+                (field_name, self.value_sets[field_path], ", ".join(values)))
+        
+        # Common date fields by resource type
+        date_fields = {
+            "Patient": ["birthDate"],
+            "Encounter": ["period.start", "period.end"],
+            "Observation": ["effectiveDateTime", "issued"],
+            "MedicationRequest": ["authoredOn"]
+        }
+        # Split nested field paths once, as (field path, parent, child) with
+        # parent None for direct fields
+        self._date_field_plan: Dict[str, List[Tuple[str, Optional[str], str]]] = {
+            resource_type: [
+                (field_path, *field_path.split(".", 1)) if "." in field_path else (field_path, None, field_path)
+                for field_path in field_paths
+            ]
+            for resource_type, field_paths in date_fields.items()
+        }
+        
+        # Define regex patterns for common fields, compiled once and applied with fullmatch()
         self.patterns = {
-            "id": r"^[A-Za-z0-9\-\.]{1,64}$",
-            "date": r"^([0-9]([0-9]([0-9][1-9]|[1-9]0)|[1-9]00)|[1-9]000)(-(0[1-9]|1[0-2])(-(0[1-9]|[1-2][0-9]|3[0-1]))?)?$",
-            "datetime": r"^([0-9]([0-9]([0-9][1-9]|[1-9]0)|[1-9]00)|[1-9]000)(-(0[1-9]|1[0-2])(-(0[1-9]|[1-2][0-9]|3[0-1])(T([01][0-9]|2[0-3]):[0-5][0-9]:([0-5][0-9]|60)(\.[0-9]{1,9})?(Z|(\+|-)((0[0-9]|1[0-3]):[0-5][0-9]|14:00)))?)?)?$",
-            "email": r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
+            "id": re.compile(r"[A-Za-z0-9\-\.]{1,64}"),
+            "date": re.compile(r"([0-9]([0-9]([0-9][1-9]|[1-9]0)|[1-9]00)|[1-9]000)(-(0[1-9]|1[0-2])(-(0[1-9]|[1-2][0-9]|3[0-1]))?)?"),
+            "datetime": re.compile(r"([0-9]([0-9]([0-9][1-9]|[1-9]0)|[1-9]00)|[1-9]000)(-(0[1-9]|1[0-2])(-(0[1-9]|[1-2][0-9]|3[0-1])(T([01][0-9]|2[0-3]):[0-5][0-9]:([0-5][0-9]|60)(\.[0-9]{1,9})?(Z|(\+|-)((0[0-9]|1[0-3]):[0-5][0-9]|14:00)))?)?)?"),
+            "email": re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
         }
     
+    def _read_json(self, file_path: str) -> Any:
+        """
+        Parse a JSON file.
+        
+        Args:
+            file_path: Path of the file to read
+            
+        Returns:
+            The parsed JSON data
+        """
+        if orjson is not None:
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                        return orjson.loads(view)
+                return orjson.loads(f.read())
+        with open(file_path, 'r', buffering=IO_BUFFER_SIZE) as f:
+            return json.load(f)
+    
     def _load_fhir_data(self, resource_type: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
         """
         Load FHIR data from JSON files.
         
+        All resource types are only read from disk on the first call; later
+        calls return the same data until invalidate() is called.
+        
         Args:
             resource_type: Optional resource type to load
             
         Returns:
             Dictionary of FHIR resources by type
         """
+        if not resource_type and self._fhir_data_cache is not None:
+            return self._fhir_data_cache
+        
         fhir_data = {}
         
         if resource_type:
             # Load a specific resource type
             file_path = os.path.join(self.fhir_dir, f"{resource_type}.json")
             if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    resources = json.load(f)
-                    fhir_data[resource_type] = resources
-                    logger.info(f"Loaded {len(resources)} {resource_type} resources from {file_path}")
+                resources = self._read_json(file_path)
+                fhir_data[resource_type] = resources
+                logger.info(f"Loaded {len(resources)} {resource_type} resources from {file_path}")
             else:
                 logger.warning(f"Resource file not found: {file_path}")
         else:
@@ -144,31 +278,35 @@ class FHIRValidator:
             for resource_type in ["Patient", "Encounter", "Observation", "MedicationRequest"]:
                 file_path = os.path.join(self.fhir_dir, f"{resource_type}.json")
                 if os.path.exists(file_path):
-                    with open(file_path, 'r') as f:
-                        resources = json.load(f)
-                        fhir_data[resource_type] = resources
-                        logger.info(f"Loaded {len(resources)} {resource_type} resources from {file_path}")
+                    resources = self._read_json(file_path)
+                    fhir_data[resource_type] = resources
+                    logger.info(f"Loaded {len(resources)} {resource_type} resources from {file_path}")
             
             # Also check for bundle file
             bundle_path = os.path.join(self.fhir_dir, "bundle.json")
             if os.path.exists(bundle_path):
-                with open(bundle_path, 'r') as f:
-                    bundle = json.load(f)
-                    
-                    # Extract resources from bundle
-                    if bundle.get("resourceType") == "Bundle" and "entry" in bundle:
-                        for entry in bundle["entry"]:
-                            if "resource" in entry:
-                                resource = entry["resource"]
-                                resource_type = resource.get("resourceType")
-                                
-                                if resource_type:
-                                    if resource_type not in fhir_data:
-                                        fhir_data[resource_type] = []
-                                    fhir_data[resource_type].append(resource)
+                bundle = self._read_json(bundle_path)
+                
+                # Extract resources from bundle
+                if bundle.get("resourceType") == "Bundle" and "entry" in bundle:
+                    for entry in bundle["entry"]:
+                        if "resource" in entry:
+                            resource = entry["resource"]
+                            resource_type = resource.get("resourceType")
+                            
+                            if resource_type:
+                                if resource_type not in fhir_data:
+                                    fhir_data[resource_type] = []
+                                fhir_data[resource_type].append(resource)
+            
+            self._fhir_data_cache = fhir_data
         
         return fhir_data
     
+    def invalidate(self) -> None:
+        """Discard the loaded FHIR data so it is read again from fhir_dir."""
+        self._fhir_data_cache = None
+    
     def validate_resource(self, resource: Dict[str, Any]) -> ValidationResult:
         """
         Validate a single FHIR resource.
@@ -203,35 +341,29 @@ class FHIRValidator:
             result.add_warning(f"Unsupported resource type: {resource_type}")
             return result
         
-        # Validate required fields
-        for field in self.required_fields[resource_type]:
-            if field not in resource:
-                result.add_error(f"Missing required field: {field}")
+        # Validate required fields; the set comparison runs in C, and only a
+        # resource that misses some field is checked field by field for the errors
+        if not resource.keys() >= self._required_field_sets[resource_type]:
+            for field in self.required_fields[resource_type]:
+                if field not in resource:
+                    result.add_error(self._missing_field_messages[field])
         
         # Validate id format
-        if "id" in resource and not re.match(self.patterns["id"], resource["id"]):
+        if "id" in resource and not self.patterns["id"].fullmatch(resource["id"]):
             result.add_error(f"Invalid id format: {resource['id']}")
         
         # Validate enumerated fields
-        for field_path, allowed_values in self.value_sets.items():
-            if field_path.startswith(f"{resource_type}."):
-                # Extract field name after the resource type
-                field_name = field_path.split(".", 1)[1]
-                if field_name in resource and resource[field_name] not in allowed_values:
-                    result.add_error(f"Invalid {field_name}: {resource[field_name]}. Must be one of: {', '.join(allowed_values)}")
+        for field_name, allowed_values, allowed_text in self._value_set_plan.get(resource_type, ()):
+            if field_name in resource and not _is_one_of(resource[field_name], allowed_values):
+                result.add_error(f"Invalid {field_name}: {resource[field_name]}. Must be one of: {allowed_text}")
         
         # Validate date/datetime fields
         self._validate_date_fields(resource, result)
         
         # Additional resource-specific validation
-        if resource_type == "Patient":
-            self._validate_patient(resource, result)
-        elif resource_type == "Encounter":
-            self._validate_encounter(resource, result)
-        elif resource_type == "Observation":
-            self._validate_observation(resource, result)
-        elif resource_type == "MedicationRequest":
-            self._validate_medication_request(resource, result)
+        validate = self._validators.get(resource_type)
+        if validate is not None:
+            validate(resource, result)
         
         return result
     
@@ -243,32 +375,24 @@ class FHIRValidator:
             resource: FHIR resource
             result: ValidationResult to update
         """
-        # Common date fields by resource type
-        date_fields = {
-            "Patient": ["birthDate"],
-            "Encounter": ["period.start", "period.end"],
-            "Observation": ["effectiveDateTime", "issued"],
-            "MedicationRequest": ["authoredOn"]
-        }
-        
-        resource_type = resource["resourceType"]
+        # Every valid date is also a valid datetime (the time part is optional),
+        # so a single match covers both
+        datetime_pattern = self.patterns["datetime"]
         
         # Check common date fields for this resource type
-        if resource_type in date_fields:
-            for field_path in date_fields[resource_type]:
+        for field_path, parent, child in self._date_field_plan.get(resource["resourceType"], ()):
+            if parent is not None:
                 # Handle nested fields
-                if "." in field_path:
-                    parent, child = field_path.split(".", 1)
-                    if parent in resource and isinstance(resource[parent], dict) and child in resource[parent]:
-                        value = resource[parent][child]
-                        if value and not re.match(self.patterns["date"], value) and not re.match(self.patterns["datetime"], value):
-                            result.add_error(f"Invalid date format in {field_path}: {value}")
-                else:
-                    # Handle direct fields
-                    if field_path in resource:
-                        value = resource[field_path]
-                        if value and not re.match(self.patterns["date"], value) and not re.match(self.patterns["datetime"], value):
-                            result.add_error(f"Invalid date format in {field_path}: {value}")
+                parent_value = resource.get(parent)
+                if not isinstance(parent_value, dict):
+                    continue
+                value = parent_value.get(child)
+            else:
+                # Handle direct fields
+                value = resource.get(field_path)
+            
+            if value and not datetime_pattern.fullmatch(value):
+                result.add_error(f"Invalid date format in {field_path}: {value}")
     
     def _validate_patient(self, resource: Dict[str, Any], result: ValidationResult) -> None:
         """
@@ -281,7 +405,7 @@ class FHIRValidator:
         # Validate gender
         if "gender" in resource:
             gender = resource["gender"]
-            if gender not in ["male", "female", "other", "unknown"]:
+            if not _is_one_of(gender, _PATIENT_GENDERS):
                 result.add_error(f"Invalid gender: {gender}. Must be one of: male, female, other, unknown")
         
         # Validate telecom
@@ -289,12 +413,12 @@ class FHIRValidator:
             for i, telecom in enumerate(resource["telecom"]):
                 if "system" not in telecom:
                     result.add_error(f"Missing system in telecom[{i}]")
-                elif telecom["system"] not in ["phone", "email", "fax", "pager", "url", "sms", "other"]:
+                elif not _is_one_of(telecom["system"], _TELECOM_SYSTEMS):
                     result.add_error(f"Invalid telecom system in telecom[{i}]: {telecom['system']}")
                 
                 if "value" not in telecom:
                     result.add_error(f"Missing value in telecom[{i}]")
-                elif telecom.get("system") == "email" and not re.match(self.patterns["email"], telecom["value"]):
+                elif telecom.get("system") == "email" and not self.patterns["email"].fullmatch(telecom["value"]):
                     result.add_error(f"Invalid email format in telecom[{i}]: {telecom['value']}")
     
     def _validate_encounter(self, resource: Dict[str, Any], result: ValidationResult) -> None:
@@ -321,15 +445,21 @@ class FHIRValidator:
                 end = period["end"]
                 
                 # If both dates are present, make sure end is not before start
-                try:
-                    start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
-                    end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
-                    
-                    if end_dt < start_dt:
+                if isinstance(start, str) and isinstance(end, str) and len(start) == len(end) == 10:
+                    # Plain YYYY-MM-DD dates sort like the days they denote, so they
+                    # are compared as strings without parsing them
+                    if end < start:
                         result.add_error(f"End date {end} is before start date {start}")
-                except (ValueError, TypeError):
-                    # If dates can't be parsed, they should already be caught by date validation
-                    pass
+                else:
+                    try:
+                        start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+                        end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
+                        
+                        if end_dt < start_dt:
+                            result.add_error(f"End date {end} is before start date {start}")
+                    except (ValueError, TypeError):
+                        # If dates can't be parsed, they should already be caught by date validation
+                        pass
     
     def _validate_observation(self, resource: Dict[str, Any], result: ValidationResult) -> None:
         """
@@ -357,12 +487,10 @@ class FHIRValidator:
             elif "text" not in code:
                 result.add_warning("Code should have either coding or text")
         
-        # Validate value[x]
-        value_present = False
-        for key in resource:
-            if key.startswith("value") and key != "value":
-                value_present = True
-                break
+        # Validate value[x]; the FHIR value types are checked with one set operation
+        # before falling back to scanning the keys for any other value* field
+        value_present = not _OBSERVATION_VALUE_KEYS.isdisjoint(resource) or any(
+            key.startswith("value") and key != "value" for key in resource)
         
         if not value_present and "dataAbsentReason" not in resource and "component" not in resource:
             result.add_warning("Observation should have a value[x], dataAbsentReason, or component")
@@ -418,7 +546,7 @@ class FHIRValidator:
                     return False
                 
                 # Check if ID is valid format
-                if not re.match(self.patterns["id"], ref_id):
+                if not self.patterns["id"].fullmatch(ref_id):
                     return False
             
             return True
@@ -433,43 +561,104 @@ class FHIRValidator:
         Returns:
             List of ValidationResult objects
         """
+        return list(self.iter_validation_results())
+    
+    def iter_validation_results(self) -> Iterator[ValidationResult]:
+        """
+        Validate all FHIR resources, yielding each result as it is produced.
+        
+        Yields:
+            ValidationResult objects in resource order
+        """
         logger.info("Starting validation of all FHIR resources")
         
         # Load FHIR data
         fhir_data = self._load_fhir_data()
         
-        results = []
+        result_count = 0
         error_count = 0
         warning_count = 0
         
-        # Validate each resource
-        for resource_type, resources in fhir_data.items():
-            logger.info(f"Validating {len(resources)} {resource_type} resources")
+        # Stopping at the first error needs results in order as they are produced,
+        # so fail_fast validation always runs in this process
+        executor = None
+        if self.workers > 1 and not self.fail_fast:
+            logger.info(f"Validating with {self.workers} worker processes")
+            executor = ProcessPoolExecutor(max_workers=self.workers,
+                                           initializer=_init_worker,
+                                           initargs=(self.fhir_dir, self.output_dir))
+        try:
+            # Submit every chunk of every resource type before collecting any results
+            validated = {
+                resource_type: self._validate_resources(resources, executor)
+                for resource_type, resources in fhir_data.items()
+            }
             
-            for resource in resources:
-                result = self.validate_resource(resource)
-                results.append(result)
+            # Per-resource results are only logged at DEBUG; INFO gets a summary per
+            # resource type, and all results are saved by save_validation_results
+            log_results = logger.isEnabledFor(logging.DEBUG)
+            
+            # Validate each resource
+            for resource_type, resources in fhir_data.items():
+                logger.info(f"Validating {len(resources)} {resource_type} resources")
+                invalid_count = 0
+                warned_count = 0
                 
-                # Log result
-                if not result.is_valid:
-                    logger.warning(str(result))
-                    error_count += len(result.errors)
+                for result in validated[resource_type]:
+                    result_count += 1
+                    yield result
                     
-                    # Stop validation if fail_fast is enabled
-                    if self.fail_fast:
-                        logger.info("Stopping validation due to fail_fast setting")
-                        break
-                elif result.warnings:
-                    logger.info(str(result))
-                    warning_count += len(result.warnings)
-            
-            # Stop if fail_fast and there are errors
-            if self.fail_fast and error_count > 0:
-                break
+                    # Log result
+                    if not result.is_valid:
+                        invalid_count += 1
+                        error_count += len(result.errors)
+                        
+                        # Stop validation if fail_fast is enabled
+                        if self.fail_fast:
+                            logger.warning(str(result))
+                            logger.info("Stopping validation due to fail_fast setting")
+                            break
+                        if log_results:
+                            logger.debug(str(result))
+                    elif result.warnings:
+                        warned_count += 1
+                        warning_count += len(result.warnings)
+                        if log_results:
+                            logger.debug(str(result))
+                
+                logger.info(f"{resource_type}: {invalid_count} invalid, {warned_count} valid with warnings")
+                
+                # Stop if fail_fast and there are errors
+                if self.fail_fast and error_count > 0:
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        
+        logger.info(f"Validation completed: {result_count} resources validated, {error_count} errors, {warning_count} warnings")
+    
+    def _validate_resources(self,
+                            resources: List[Dict[str, Any]],
+                            executor: Optional[Executor]) -> Iterator[ValidationResult]:
+        """
+        Validate resources lazily, in worker processes if an executor is given.
         
-        logger.info(f"Validation completed: {len(results)} resources validated, {error_count} errors, {warning_count} warnings")
+        With an executor the resources are split into one chunk per worker,
+        submitted immediately, and their results yielded in input order.
         
-        return results
+        Args:
+            resources: FHIR resources to validate
+            executor: Executor running the worker processes, or None
+            
+        Returns:
+            Iterator over the ValidationResults in input order
+        """
+        if executor is None:
+            return map(self.validate_resource, resources)
+        
+        chunk_size = max(1, -(-len(resources) // self.workers))
+        chunks = [resources[i:i + chunk_size] for i in range(0, len(resources), chunk_size)]
+        return chain.from_iterable(executor.map(_validate_chunk, chunks))
     
     def cross_validate_resources(self, results: List[ValidationResult]) -> List[ValidationResult]:
         """
@@ -487,18 +676,21 @@ class FHIRValidator:
         fhir_data = self._load_fhir_data()
         
         # Create lookup dictionaries for resources
-        resource_map = {}
-        for resource_type, resources in fhir_data.items():
-            if resource_type not in resource_map:
-                resource_map[resource_type] = {}
-            
-            for resource in resources:
-                if "id" in resource:
-                    resource_map[resource_type][resource["id"]] = resource
+        resource_map = {
+            resource_type: {resource["id"]: resource for resource in resources if "id" in resource}
+            for resource_type, resources in fhir_data.items()
+        }
+        
+        # Index the validation results by resource type and ID, keeping the
+        # first result for each like the lookup it replaces
+        result_index: Dict[Tuple[str, str], ValidationResult] = {}
+        for r in results:
+            result_index.setdefault((r.resource_type, r.resource_id), r)
         
         # Check references between resources
         for resource_type, resources in fhir_data.items():
             logger.info(f"Cross-validating references in {len(resources)} {resource_type} resources")
+            cross_validate = self._cross_validators.get(resource_type)
             
             for resource in resources:
                 resource_id = resource.get("id")
@@ -506,24 +698,17 @@ class FHIRValidator:
                     continue
                 
                 # Find the corresponding validation result
-                result = None
-                for r in results:
-                    if r.resource_type == resource_type and r.resource_id == resource_id:
-                        result = r
-                        break
+                result = result_index.get((resource_type, resource_id))
                 
                 if not result:
                     # Create a new validation result if not found
                     result = ValidationResult(resource_type=resource_type, resource_id=resource_id, is_valid=True)
                     results.append(result)
+                    result_index[(resource_type, resource_id)] = result
                 
                 # Validate references based on resource type
-                if resource_type == "Encounter":
-                    self._cross_validate_encounter(resource, result, resource_map)
-                elif resource_type == "Observation":
-                    self._cross_validate_observation(resource, result, resource_map)
-                elif resource_type == "MedicationRequest":
-                    self._cross_validate_medication_request(resource, result, resource_map)
+                if cross_validate is not None:
+                    cross_validate(resource, result, resource_map)
         
         logger.info("Cross-validation completed")
         return results
@@ -539,10 +724,11 @@ class FHIRValidator:
         """
         # Validate subject reference
         if "subject" in resource and "reference" in resource["subject"]:
-            ref = resource["subject"]["reference"]
-            if ref.startswith("Patient/"):
-                patient_id = ref.split("/")[1]
-                if "Patient" not in resource_map or patient_id not in resource_map["Patient"]:
+            ref_type, sep, ref_path = resource["subject"]["reference"].partition("/")
+            if ref_type == "Patient" and sep:
+                # The id ends at the next slash, before any /_history/ version
+                patient_id = ref_path.partition("/")[0]
+                if patient_id not in resource_map.get("Patient", {}):
                     result.add_error(f"Referenced Patient not found: {patient_id}")
     
     def _cross_validate_observation(self, resource: Dict[str, Any], result: ValidationResult, resource_map: Dict[str, Dict[str, Any]]) -> None:
@@ -556,18 +742,18 @@ class FHIRValidator:
         """
         # Validate subject reference
         if "subject" in resource and "reference" in resource["subject"]:
-            ref = resource["subject"]["reference"]
-            if ref.startswith("Patient/"):
-                patient_id = ref.split("/")[1]
-                if "Patient" not in resource_map or patient_id not in resource_map["Patient"]:
+            ref_type, sep, ref_path = resource["subject"]["reference"].partition("/")
+            if ref_type == "Patient" and sep:
+                patient_id = ref_path.partition("/")[0]
+                if patient_id not in resource_map.get("Patient", {}):
                     result.add_error(f"Referenced Patient not found: {patient_id}")
         
         # Validate encounter reference
         if "encounter" in resource and "reference" in resource["encounter"]:
-            ref = resource["encounter"]["reference"]
-            if ref.startswith("Encounter/"):
-                encounter_id = ref.split("/")[1]
-                if "Encounter" not in resource_map or encounter_id not in resource_map["Encounter"]:
+            ref_type, sep, ref_path = resource["encounter"]["reference"].partition("/")
+            if ref_type == "Encounter" and sep:
+                encounter_id = ref_path.partition("/")[0]
+                if encounter_id not in resource_map.get("Encounter", {}):
                     result.add_error(f"Referenced Encounter not found: {encounter_id}")
     
     def _cross_validate_medication_request(self, resource: Dict[str, Any], result: ValidationResult, resource_map: Dict[str, Dict[str, Any]]) -> None:
@@ -581,61 +767,69 @@ class FHIRValidator:
         """
         # Validate subject reference
         if "subject" in resource and "reference" in resource["subject"]:
-            ref = resource["subject"]["reference"]
-            if ref.startswith("Patient/"):
-                patient_id = ref.split("/")[1]
-                if "Patient" not in resource_map or patient_id not in resource_map["Patient"]:
+            ref_type, sep, ref_path = resource["subject"]["reference"].partition("/")
+            if ref_type == "Patient" and sep:
+                patient_id = ref_path.partition("/")[0]
+                if patient_id not in resource_map.get("Patient", {}):
                     result.add_error(f"Referenced Patient not found: {patient_id}")
         
         # Validate encounter reference
         if "encounter" in resource and "reference" in resource["encounter"]:
-            ref = resource["encounter"]["reference"]
-            if ref.startswith("Encounter/"):
-                encounter_id = ref.split("/")[1]
-                if "Encounter" not in resource_map or encounter_id not in resource_map["Encounter"]:
+            ref_type, sep, ref_path = resource["encounter"]["reference"].partition("/")
+            if ref_type == "Encounter" and sep:
+                encounter_id = ref_path.partition("/")[0]
+                if encounter_id not in resource_map.get("Encounter", {}):
                     result.add_error(f"Referenced Encounter not found: {encounter_id}")
     
-    def save_validation_results(self, results: List[ValidationResult]) -> None:
+    def save_validation_results(self, results: Iterable[ValidationResult]) -> Dict[str, Any]:
         """
         Save validation results to JSON file.
         
-        Args:
-            results: List of ValidationResult objects
-        """
-        # Convert results to serializable format
-        serializable_results = []
-        for result in results:
-            serializable_results.append({
-                "resource_type": result.resource_type,
-                "resource_id": result.resource_id,
-                "is_valid": result.is_valid,
-                "errors": result.errors,
-                "warnings": result.warnings
-            })
-        
-        # Calculate statistics
-        total = len(results)
-        valid = sum(1 for r in results if r.is_valid)
-        invalid = total - valid
-        with_warnings = sum(1 for r in results if r.is_valid and r.warnings)
-        
-        stats = {
-            "total": total,
-            "valid": valid,
-            "invalid": invalid,
-            "with_warnings": with_warnings,
-            "validation_time": datetime.now().isoformat()
-        }
+        Results are written as they are consumed, so results from
+        iter_validation_results() are saved without holding them all in memory.
+        The statistics follow the results in the file.
         
-        # Save results
-        output = {
-            "statistics": stats,
-            "results": serializable_results
-        }
+        Args:
+            results: ValidationResult objects
+            
+        Returns:
+            Validation statistics
+        """
+        total = 0
+        valid = 0
+        with_warnings = 0
+        errors_by_type: Dict[str, Counter] = defaultdict(Counter)
+        warnings_by_type: Dict[str, Counter] = defaultdict(Counter)
         
         output_file = os.path.join(self.output_dir, "validation_results.json")
-        with open(output_file, 'w') as f:
-            json.dump(output, f, indent=2)
+        with open(output_file, 'wb', buffering=IO_BUFFER_SIZE) as f:
+            # Write each result as an element of the results array, indented to its level,
+            # while calculating statistics and grouping errors and warnings by resource type
+            f.write(b'{\n  "results": [')
+            for result in results:
+                f.write(b",\n    " if total else b"\n    ")
+                f.write(_dumps_indented(vars(result)).replace(b"\n", b"\n    "))
+                
+                total += 1
+                if result.is_valid:
+                    valid += 1
+                    if result.warnings:
+                        with_warnings += 1
+                else:
+                    errors_by_type[result.resource_type].update(result.errors)
+                
+                if result.warnings:
+                    warnings_by_type[result.resource_type].update(result.warnings)
+            f.write(b"\n  ]" if total else b"]")
+            
+            stats = {
+                "total": total,
+                "valid": valid,
+                "invalid": total - valid,
+                "with_warnings": with_warnings,
+                "validation_time": datetime.now().isoformat()
+            }
+            f.write(b',\n  "statistics": ' + _dumps_indented(stats).replace(b"\n", b"\n  ") + b"\n}")
         
         logger.info(f"Saved validation results to {output_file}")
         
@@ -650,46 +844,25 @@ class FHIRValidator:
             f.write(f"Invalid Resources: {stats['invalid']} ({stats['invalid']/stats['total']*100:.1f}%)\n")
             f.write(f"Valid Resources with Warnings: {stats['with_warnings']} ({stats['with_warnings']/stats['valid']*100:.1f}% of valid)\n\n")
             
-            # Group errors and warnings by resource type
-            errors_by_type = {}
-            warnings_by_type = {}
-            
-            for result in results:
-                if not result.is_valid:
-                    if result.resource_type not in errors_by_type:
-                        errors_by_type[result.resource_type] = []
-                    errors_by_type[result.resource_type].extend(result.errors)
-                
-                if result.warnings:
-                    if result.resource_type not in warnings_by_type:
-                        warnings_by_type[result.resource_type] = []
-                    warnings_by_type[result.resource_type].extend(result.warnings)
-            
             # Write error summary
             if errors_by_type:
                 f.write(f"Common Errors:\n")
-                for resource_type, errors in errors_by_type.items():
+                for resource_type, error_counts in errors_by_type.items():
                     f.write(f"\n{resource_type}:\n")
-                    error_counts = {}
-                    for error in errors:
-                        error_counts[error] = error_counts.get(error, 0) + 1
-                    
-                    for error, count in sorted(error_counts.items(), key=lambda x: x[1], reverse=True):
+                    for error, count in error_counts.most_common():
                         f.write(f"  - {error} ({count} occurrences)\n")
             
             # Write warning summary
             if warnings_by_type:
                 f.write(f"\nCommon Warnings:\n")
-                for resource_type, warnings in warnings_by_type.items():
+                for resource_type, warning_counts in warnings_by_type.items():
                     f.write(f"\n{resource_type}:\n")
-                    warning_counts = {}
-                    for warning in warnings:
-                        warning_counts[warning] = warning_counts.get(warning, 0) + 1
-                    
-                    for warning, count in sorted(warning_counts.items(), key=lambda x: x[1], reverse=True):
+                    for warning, count in warning_counts.most_common():
                         f.write(f"  - {warning} ({count} occurrences)\n")
         
         logger.info(f"Saved validation summary to {summary_file}")
+        
+        return stats
 
 
 def main():
@@ -699,6 +872,7 @@ def main():
     parser.add_argument('--output-dir', default='./validation_results', help='Directory to save validation results')
     parser.add_argument('--fail-fast', action='store_true', help='Stop validation after the first error')
     parser.add_argument('--cross-validate', action='store_true', help='Perform cross-validation between resources')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes used to validate resources (ignored with --fail-fast)')
     
     args = parser.parse_args()
     
@@ -707,21 +881,22 @@ def main():
         validator = FHIRValidator(
             fhir_dir=args.fhir_dir,
             output_dir=args.output_dir,
-            fail_fast=args.fail_fast
+            fail_fast=args.fail_fast,
+            workers=args.workers
         )
         
-        # Validate resources
-        results = validator.validate_all_resources()
-        
-        # Perform cross-validation if requested
+        # Validate resources, cross-validating them if requested; without
+        # cross-validation, results are saved as they are produced
         if args.cross_validate:
-            results = validator.cross_validate_resources(results)
+            results = validator.cross_validate_resources(validator.validate_all_resources())
+        else:
+            results = validator.iter_validation_results()
         
         # Save validation results
-        validator.save_validation_results(results)
+        stats = validator.save_validation_results(results)
         
         # Determine exit code
-        if all(result.is_valid for result in results):
+        if stats["invalid"] == 0:
             logger.info("All resources are valid")
             exit_code = 0
         else:
@@ -12,31 +12,88 @@ import json
 import random
 import datetime
 import argparse
-import uuid
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, List, Any, Optional, Iterator
+
+# orjson is optional; fall back to the stdlib json module when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Buffer size for the streamed NDJSON output files
+IO_BUFFER_SIZE = 1 << 20
+
+# Letters used for middle initials
+_UPPERCASE = tuple("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+
+def _dumps_line(value: Any) -> bytes:
+    """Serialize a value as one compact JSON line."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_APPEND_NEWLINE)
+    return json.dumps(value).encode() + b"\n"
+
+
+# Generator instance owned by each worker process of a parallel generation
+_worker_generator = None
+
+
+def _init_worker(output_dir: str, today: datetime.date) -> None:
+    """Create the generator used by a worker process."""
+    global _worker_generator
+    _worker_generator = SyntheticEHRGenerator(output_dir)
+    _worker_generator._today = today
+
+
+def _generate_seeded_record(seed: int) -> Dict[str, Any]:
+    """Generate one patient record in a worker process."""
+    return _worker_generator._generate_seeded_record(seed)
 
 
 class SyntheticEHRGenerator:
     """Generate synthetic EHR data for testing and development purposes."""
     
-    def __init__(self, output_dir: str = "./legacy_ehr_data", seed: Optional[int] = None):
+    def __init__(self, output_dir: str = "./legacy_ehr_data", seed: Optional[int] = None,
+                 workers: int = 1, pretty: bool = False):
         """
         Initialize the synthetic data generator.
         
         Args:
             output_dir: Directory to save generated data
             seed: Random seed for reproducibility
+            workers: Number of worker processes used to generate patient records
+            pretty: Indent the JSON files written by save_database for readability;
+                files are written compactly otherwise
         """
         self.output_dir = output_dir
-        
-        # Set random seed for reproducibility if provided
-        if seed is not None:
-            random.seed(seed)
+        self.workers = workers
+        self.pretty = pretty
+        
+        # Date generated records are relative to; fixed for the duration of
+        # generate_database, otherwise read from the clock on each use
+        self._today: Optional[datetime.date] = None
+        
+        # Random number generator of this instance, seeded for reproducibility if a
+        # seed is provided; kept apart from the random module's shared state
+        self.rng = random.Random(seed)
+        
+        # Next ID number per record prefix; each counter starts at a random base
+        # and increments, so IDs are unique within a generated database
+        self._next_ids = {
+            "PT": self.rng.randint(10000, 99999),
+            "ENC": self.rng.randint(100000, 999999),
+            "OBS": self.rng.randint(1000000, 9999999),
+            "MED": self.rng.randint(1000000, 9999999)
+        }
             
         # Create output directory if it doesn't exist
-        if not os.path.exists(output_dir):
+        try:
             os.makedirs(output_dir)
             print(f"Created output directory: {output_dir}")
+        except FileExistsError:
+            pass
             
         # Load reference data for realistic generation
         self._load_reference_data()
@@ -51,6 +108,10 @@ class SyntheticEHRGenerator:
             "Michelle", "Amanda", "Melissa", "Stephanie", "Rebecca", "Laura", "Sharon", "Cynthia", "Kathleen", "Amy"
         ]
         
+        # First names by gender (the first 20 names are male, the rest female)
+        self.male_first_names = self.first_names[:20]
+        self.female_first_names = self.first_names[20:]
+        
         # Common last names
         self.last_names = [
             "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
@@ -67,6 +128,11 @@ class SyntheticEHRGenerator:
             "Willow Street", "Ridge Road", "Woodland Drive", "Broadway"
         ]
         
+        # Insurance companies
+        self.insurances = [
+            "Medicare", "Medicaid", "Blue Cross Blue Shield", "Aetna", "UnitedHealthcare", "Cigna", "Kaiser", "Humana"
+        ]
+        
         # Common cities
         self.cities = [
             "Springfield", "Franklin", "Greenville", "Bristol", "Clinton", "Kingston", "Marion", "Salem",
@@ -102,6 +168,12 @@ class SyntheticEHRGenerator:
             ("Migraine", "G43.909")
         ]
         
+        # Encounter diagnosis entries, built once and copied into each encounter
+        self.diagnosis_entries = [
+            {"diagnosis": diagnosis_name, "code": diagnosis_code, "type": "ICD-10"}
+            for diagnosis_name, diagnosis_code in self.diagnoses
+        ]
+        
         # Common medications with units
         self.medications = [
             ("Lisinopril", "10 mg"),
@@ -180,6 +252,21 @@ class SyntheticEHRGenerator:
             }
         }
         
+        # Reference ranges parsed once as (component, range_str, unit, bands), where
+        # bands maps each result status to the (start, width) of the values drawn for it
+        self.lab_ranges = {}
+        for lab_code, components in self.lab_units.items():
+            parsed = []
+            for component, (range_str, unit) in components.items():
+                low, high = map(float, range_str.split("-"))
+                bands = {
+                    "normal": (low, high - low),
+                    "low": (low * 0.7, low * 0.99 - low * 0.7),
+                    "high": (high * 1.01, high * 1.3 - high * 1.01)
+                }
+                parsed.append((component, range_str, unit, bands))
+            self.lab_ranges[lab_code] = parsed
+        
         # Common encounter types
         self.encounter_types = [
             "Office Visit", "Hospital Encounter", "Telehealth", "Emergency", "Surgery", 
@@ -205,6 +292,37 @@ class SyntheticEHRGenerator:
             "Dr. William Thompson", "Dr. Maria Rodriguez", "Dr. Thomas Anderson", "Dr. Susan Davis",
             "Dr. Richard Lee", "Dr. Patricia Scott", "Dr. Joseph Wright", "Dr. Emily Clark"
         ]
+        
+        # Common chief complaints
+        self.chief_complaints = [
+            "Chest pain", "Shortness of breath", "Headache", "Abdominal pain",
+            "Back pain", "Fatigue", "Fever", "Cough", "Nausea", "Dizziness",
+            "Rash", "Sore throat", "Joint pain", "Difficulty sleeping", "Anxiety"
+        ]
+        
+        # Common encounter locations
+        self.encounter_locations = [
+            "Main Campus", "North Clinic", "South Clinic", "East Wing", "West Wing", "Telehealth"
+        ]
+        
+        # Common endings for encounter notes
+        self.note_endings = [
+            "Patient advised to follow up in 2 weeks.",
+            "Prescription provided. Follow up as needed.",
+            "Referral to specialist recommended.",
+            "Patient counseled on lifestyle modifications.",
+            "Condition improved with treatment."
+        ]
+    
+    def _next_id(self, prefix: str) -> str:
+        """Return the next unique ID for the given record prefix."""
+        number = self._next_ids[prefix]
+        self._next_ids[prefix] = number + 1
+        return f"{prefix}{number}"
+    
+    def _current_date(self) -> datetime.date:
+        """Return the date generated records are relative to."""
+        return self._today or datetime.date.today()
     
     def generate_patient(self) -> Dict[str, Any]:
         """
@@ -214,51 +332,51 @@ class SyntheticEHRGenerator:
             Dictionary containing patient demographic information
         """
         # Generate a unique patient ID
-        patient_id = f"PT{random.randint(10000, 99999)}"
+        patient_id = self._next_id("PT")
         
         # Randomly select gender
-        gender = random.choice(["M", "F"])
+        gender = self.rng.choice(["M", "F"])
         
         # Generate random name based on gender
         if gender == "M":
-            first_name = random.choice(self.first_names[:20])
+            first_name = self.rng.choice(self.male_first_names)
         else:
-            first_name = random.choice(self.first_names[20:])
-        last_name = random.choice(self.last_names)
+            first_name = self.rng.choice(self.female_first_names)
+        last_name = self.rng.choice(self.last_names)
         
-        # Generate date of birth (between 18 and 90 years ago)
-        years_ago = random.randint(18, 90)
-        days_variation = random.randint(0, 365)
-        dob = datetime.datetime.now() - datetime.timedelta(days=years_ago*365 + days_variation)
-        dob_str = dob.strftime("%Y-%m-%d")
+        # Generate date of birth (between 18 and 90 years ago); dates are computed
+        # as day ordinals, avoiding a timedelta per date
+        today = self._current_date().toordinal()
+        years_ago = self.rng.randint(18, 90)
+        days_variation = self.rng.randint(0, 365)
+        dob_str = datetime.date.fromordinal(today - (years_ago*365 + days_variation)).isoformat()
         
         # Generate random address
-        street_number = random.randint(1, 9999)
-        street = random.choice(self.streets)
-        city = random.choice(self.cities)
-        state, state_abbr = random.choice(self.states)
-        zipcode = f"{random.randint(10000, 99999)}"
+        street_number = self.rng.randint(1, 9999)
+        street = self.rng.choice(self.streets)
+        city = self.rng.choice(self.cities)
+        state, state_abbr = self.rng.choice(self.states)
+        zipcode = f"{self.rng.randint(10000, 99999)}"
         
         # Generate random contact information
-        phone = f"{random.randint(200, 999)}-{random.randint(200, 999)}-{random.randint(1000, 9999)}"
-        has_email = random.random() > 0.3  # 70% chance of having email
+        phone = f"{self.rng.randint(200, 999)}-{self.rng.randint(200, 999)}-{self.rng.randint(1000, 9999)}"
+        has_email = self.rng.random() > 0.3  # 70% chance of having email
         if has_email:
-            email = f"{first_name.lower()}.{last_name.lower()}{random.randint(1, 999)}@example.com"
+            email = f"{first_name.lower()}.{last_name.lower()}{self.rng.randint(1, 999)}@example.com"
         else:
             email = None
         
         # Generate random insurance information
-        insurances = ["Medicare", "Medicaid", "Blue Cross Blue Shield", "Aetna", "UnitedHealthcare", "Cigna", "Kaiser", "Humana"]
-        has_insurance = random.random() > 0.1  # 90% chance of having insurance
+        has_insurance = self.rng.random() > 0.1  # 90% chance of having insurance
         if has_insurance:
-            insurance = random.choice(insurances)
-            insurance_id = f"INS{random.randint(10000000, 99999999)}"
+            insurance = self.rng.choice(self.insurances)
+            insurance_id = f"INS{self.rng.randint(10000000, 99999999)}"
         else:
             insurance = "Self Pay"
             insurance_id = None
         
         # Generate random MRN (Medical Record Number)
-        mrn = f"MRN{random.randint(100000, 999999)}"
+        mrn = f"MRN{self.rng.randint(100000, 999999)}"
         
         # Build patient record in legacy EHR format
         patient = {
@@ -266,12 +384,12 @@ class SyntheticEHRGenerator:
             "mrn": mrn,
             "first_name": first_name,
             "last_name": last_name,
-            "middle_name": random.choice(["", random.choice(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))]),
+            "middle_name": self.rng.choice(("", self.rng.choice(_UPPERCASE))),
             "birth_date": dob_str,
             "gender": gender,
             "address": {
                 "line1": f"{street_number} {street}",
-                "line2": random.choice(["", f"Apt {random.randint(1, 999)}"]),
+                "line2": self.rng.choice(["", f"Apt {self.rng.randint(1, 999)}"]),
                 "city": city,
                 "state": state,
                 "state_code": state_abbr,
@@ -285,12 +403,12 @@ class SyntheticEHRGenerator:
             "insurance": {
                 "company": insurance,
                 "id": insurance_id,
-                "group_number": f"GRP{random.randint(1000, 9999)}" if has_insurance and insurance != "Medicare" and insurance != "Medicaid" else None
+                "group_number": f"GRP{self.rng.randint(1000, 9999)}" if has_insurance and insurance != "Medicare" and insurance != "Medicaid" else None
             },
-            "registration_date": (datetime.datetime.now() - datetime.timedelta(days=random.randint(0, years_ago*365))).strftime("%Y-%m-%d"),
-            "active": random.random() > 0.1,  # 90% chance of being active
-            "deceased": random.random() < 0.05,  # 5% chance of being deceased
-            "preferred_language": random.choice(["English", "English", "English", "Spanish", "Chinese", "French"])
+            "registration_date": datetime.date.fromordinal(today - self.rng.randint(0, years_ago*365)).isoformat(),
+            "active": self.rng.random() > 0.1,  # 90% chance of being active
+            "deceased": self.rng.random() < 0.05,  # 5% chance of being deceased
+            "preferred_language": self.rng.choice(["English", "English", "English", "Spanish", "Chinese", "French"])
         }
         
         return patient
@@ -306,39 +424,28 @@ class SyntheticEHRGenerator:
             Dictionary containing encounter information
         """
         # Generate encounter ID
-        encounter_id = f"ENC{random.randint(100000, 999999)}"
+        encounter_id = self._next_id("ENC")
         
         # Generate random encounter type and status
-        encounter_type = random.choice(self.encounter_types)
-        status = random.choice(self.encounter_statuses)
+        encounter_type = self.rng.choice(self.encounter_types)
+        status = self.rng.choice(self.encounter_statuses)
         
         # Generate random provider
-        provider_name = random.choice(self.provider_names)
-        provider_specialty = random.choice(self.provider_specialties)
-        provider_id = f"PROV{provider_name.replace('Dr. ', '').replace(' ', '')[0:3]}{random.randint(100, 999)}"
+        provider_name = self.rng.choice(self.provider_names)
+        provider_specialty = self.rng.choice(self.provider_specialties)
+        provider_id = f"PROV{provider_name.replace('Dr. ', '').replace(' ', '')[0:3]}{self.rng.randint(100, 999)}"
         
         # Generate random encounter date (within last 2 years)
-        days_ago = random.randint(0, 730)
-        encounter_date = (datetime.datetime.now() - datetime.timedelta(days=days_ago)).strftime("%Y-%m-%d")
+        days_ago = self.rng.randint(0, 730)
+        encounter_day = self._current_date().toordinal() - days_ago
+        encounter_date = datetime.date.fromordinal(encounter_day).isoformat()
         
         # Generate random diagnoses (1-3)
-        num_diagnoses = random.randint(1, 3)
-        diagnoses = []
-        selected_diagnoses = random.sample(self.diagnoses, num_diagnoses)
-        for diagnosis_name, diagnosis_code in selected_diagnoses:
-            diagnoses.append({
-                "diagnosis": diagnosis_name,
-                "code": diagnosis_code,
-                "type": "ICD-10"
-            })
+        num_diagnoses = self.rng.randint(1, 3)
+        diagnoses = [dict(entry) for entry in self.rng.sample(self.diagnosis_entries, num_diagnoses)]
         
         # Generate random chief complaint
-        chief_complaints = [
-            "Chest pain", "Shortness of breath", "Headache", "Abdominal pain",
-            "Back pain", "Fatigue", "Fever", "Cough", "Nausea", "Dizziness",
-            "Rash", "Sore throat", "Joint pain", "Difficulty sleeping", "Anxiety"
-        ]
-        chief_complaint = random.choice(chief_complaints)
+        chief_complaint = self.rng.choice(self.chief_complaints)
         
         # Build encounter record in legacy EHR format
         encounter = {
@@ -354,7 +461,7 @@ class SyntheticEHRGenerator:
             "encounter_date": encounter_date,
             "chief_complaint": chief_complaint,
             "diagnoses": diagnoses,
-            "location": random.choice(["Main Campus", "North Clinic", "South Clinic", "East Wing", "West Wing", "Telehealth"])
+            "location": self.rng.choice(self.encounter_locations)
         }
         
         # Add discharge date if encounter is complete
@@ -362,10 +469,9 @@ class SyntheticEHRGenerator:
             # Randomly determine length of stay (0-10 days)
             length_of_stay = 0
             if encounter_type in ["Hospital Encounter", "Emergency", "Surgery"]:
-                length_of_stay = random.randint(0, 10)
+                length_of_stay = self.rng.randint(0, 10)
                 
-            discharge_date = (datetime.datetime.strptime(encounter_date, "%Y-%m-%d") + 
-                             datetime.timedelta(days=length_of_stay)).strftime("%Y-%m-%d")
+            discharge_date = datetime.date.fromordinal(encounter_day + length_of_stay).isoformat()
             encounter["discharge_date"] = discharge_date
         
         # Add notes if completed
@@ -375,14 +481,7 @@ class SyntheticEHRGenerator:
                 encounter["notes"] += f"Diagnosed with {diagnoses[0]['diagnosis']}. "
             
             # Add random note ending
-            note_endings = [
-                "Patient advised to follow up in 2 weeks.",
-                "Prescription provided. Follow up as needed.",
-                "Referral to specialist recommended.",
-                "Patient counseled on lifestyle modifications.",
-                "Condition improved with treatment."
-            ]
-            encounter["notes"] += random.choice(note_endings)
+            encounter["notes"] += self.rng.choice(self.note_endings)
         
         return encounter
     
@@ -398,62 +497,49 @@ class SyntheticEHRGenerator:
             Dictionary containing observation information
         """
         # Generate observation ID
-        observation_id = f"OBS{random.randint(1000000, 9999999)}"
+        observation_id = self._next_id("OBS")
         
         # Generate random test
-        lab_test, lab_code = random.choice(self.lab_tests)
+        lab_test, lab_code = self.rng.choice(self.lab_tests)
         
         # Generate observation date based on encounter date
         # Assume observation is taken on the same day as encounter for simplicity
-        observation_date = datetime.datetime.now().strftime("%Y-%m-%d")
+        observation_date = self._current_date().isoformat()
         
         # Generate random values if test has predefined units
         results = []
-        if lab_code in self.lab_units:
-            for component, (range_str, unit) in self.lab_units[lab_code].items():
-                try:
-                    # Parse range and generate a value within or slightly outside that range
-                    low, high = map(float, range_str.split("-"))
-                    # 80% chance value is within range, 20% chance it's slightly abnormal
-                    if random.random() < 0.8:
-                        value = round(random.uniform(low, high), 1)
-                        status = "normal"
-                    else:
-                        # Generate slightly abnormal value
-                        if random.random() < 0.5:
-                            # Lower than normal
-                            value = round(random.uniform(low * 0.7, low * 0.99), 1)
-                            status = "low"
-                        else:
-                            # Higher than normal
-                            value = round(random.uniform(high * 1.01, high * 1.3), 1)
-                            status = "high"
-                            
-                    results.append({
-                        "component": component,
-                        "value": str(value),
-                        "unit": unit,
-                        "reference_range": range_str,
-                        "status": status
-                    })
-                except ValueError:
-                    # Fallback for malformed ranges
-                    results.append({
-                        "component": component,
-                        "value": "5.0",
-                        "unit": unit,
-                        "reference_range": range_str,
-                        "status": "normal"
-                    })
+        if lab_code in self.lab_ranges:
+            for component, range_str, unit, bands in self.lab_ranges[lab_code]:
+                # Generate a value within or slightly outside the reference range
+                # 80% chance value is within range, 20% chance it's slightly abnormal
+                if self.rng.random() < 0.8:
+                    status = "normal"
+                elif self.rng.random() < 0.5:
+                    # Lower than normal
+                    status = "low"
+                else:
+                    # Higher than normal
+                    status = "high"
+                # Same arithmetic as Random.uniform(start, start + width)
+                start, width = bands[status]
+                value = start + width * self.rng.random()
+                
+                results.append({
+                    "component": component,
+                    "value": f"{value:.1f}",
+                    "unit": unit,
+                    "reference_range": range_str,
+                    "status": status
+                })
         else:
             # Generate generic result for tests without predefined units
             status_options = ["normal", "abnormal", "normal", "normal"]  # 75% chance of being normal
             results.append({
                 "component": lab_test,
-                "value": str(round(random.uniform(1, 100), 1)),
-                "unit": random.choice(["mg/dL", "mmol/L", "U/L", "%"]),
-                "reference_range": f"{round(random.uniform(1, 40), 1)}-{round(random.uniform(41, 120), 1)}",
-                "status": random.choice(status_options)
+                "value": f"{self.rng.uniform(1, 100):.1f}",
+                "unit": self.rng.choice(["mg/dL", "mmol/L", "U/L", "%"]),
+                "reference_range": f"{self.rng.uniform(1, 40):.1f}-{self.rng.uniform(41, 120):.1f}",
+                "status": self.rng.choice(status_options)
             })
         
         # Build observation record in legacy EHR format
@@ -465,8 +551,8 @@ class SyntheticEHRGenerator:
             "test_code": lab_code,
             "observation_date": observation_date,
             "results": results,
-            "status": random.choice(["final", "preliminary", "corrected", "cancelled"]),
-            "performer": random.choice(["Main Lab", "Point of Care", "Reference Lab", "Radiology"])
+            "status": self.rng.choice(["final", "preliminary", "corrected", "cancelled"]),
+            "performer": self.rng.choice(["Main Lab", "Point of Care", "Reference Lab", "Radiology"])
         }
         
         return observation
@@ -483,22 +569,22 @@ class SyntheticEHRGenerator:
             Dictionary containing medication information
         """
         # Generate medication ID
-        medication_id = f"MED{random.randint(1000000, 9999999)}"
+        medication_id = self._next_id("MED")
         
         # Generate random medication
-        medication_name, medication_dose = random.choice(self.medications)
+        medication_name, medication_dose = self.rng.choice(self.medications)
         
         # Generate prescription date based on encounter
-        prescription_date = datetime.datetime.now().strftime("%Y-%m-%d")
+        prescription_date = self._current_date().isoformat()
         
         # Generate random duration (in days)
-        duration_days = random.choice([7, 10, 14, 30, 60, 90, 180, 365])
+        duration_days = self.rng.choice([7, 10, 14, 30, 60, 90, 180, 365])
         
         # Generate random frequency
         frequencies = ["Once daily", "Twice daily", "Three times daily", "Four times daily", 
                       "Every morning", "Every evening", "Every 4 hours", "Every 6 hours",
                       "Every 8 hours", "Every 12 hours", "As needed", "Weekly"]
-        frequency = random.choice(frequencies)
+        frequency = self.rng.choice(frequencies)
         
         # Build medication record in legacy EHR format
         medication = {
@@ -507,14 +593,14 @@ class SyntheticEHRGenerator:
             "encounter_id": encounter_id,
             "medication_name": medication_name,
             "dose": medication_dose,
-            "route": random.choice(["Oral", "Intravenous", "Intramuscular", "Topical", "Inhalation", "Subcutaneous"]),
+            "route": self.rng.choice(["Oral", "Intravenous", "Intramuscular", "Topical", "Inhalation", "Subcutaneous"]),
             "frequency": frequency,
             "prescription_date": prescription_date,
             "duration_days": duration_days,
-            "refills": random.randint(0, 5),
-            "status": random.choice(["active", "completed", "cancelled", "on-hold"]),
-            "prescriber": random.choice(self.provider_names),
-            "pharmacy": random.choice(["CVS Pharmacy", "Walgreens", "Rite Aid", "Hospital Pharmacy", "Mail Order"])
+            "refills": self.rng.randint(0, 5),
+            "status": self.rng.choice(["active", "completed", "cancelled", "on-hold"]),
+            "prescriber": self.rng.choice(self.provider_names),
+            "pharmacy": self.rng.choice(["CVS Pharmacy", "Walgreens", "Rite Aid", "Hospital Pharmacy", "Mail Order"])
         }
         
         return medication
@@ -534,7 +620,7 @@ class SyntheticEHRGenerator:
         patient_id = patient["patient_id"]
         
         # Generate random number of encounters
-        num_encounters = random.randint(num_encounters_range[0], num_encounters_range[1])
+        num_encounters = self.rng.randint(num_encounters_range[0], num_encounters_range[1])
         
         encounters = []
         observations = []
@@ -548,13 +634,13 @@ class SyntheticEHRGenerator:
             encounters.append(encounter)
             
             # Generate random number of observations (0-5)
-            num_observations = random.randint(0, 5)
+            num_observations = self.rng.randint(0, 5)
             for _ in range(num_observations):
                 observation = self.generate_observation(patient_id, encounter_id)
                 observations.append(observation)
             
             # Generate random number of medications (0-3)
-            num_medications = random.randint(0, 3)
+            num_medications = self.rng.randint(0, 3)
             for _ in range(num_medications):
                 medication = self.generate_medication(patient_id, encounter_id)
                 medications.append(medication)
@@ -569,6 +655,101 @@ class SyntheticEHRGenerator:
         
         return patient_record
     
+    def _generate_seeded_record(self, seed: int) -> Dict[str, Any]:
+        """
+        Generate a complete patient record from its own random seed.
+        
+        Args:
+            seed: Random seed for this patient's record
+            
+        Returns:
+            Dictionary containing complete patient data
+        """
+        self.rng.seed(seed)
+        return self.generate_full_patient_record()
+    
+    def _assign_record_ids(self, patient_record: Dict[str, Any]) -> None:
+        """
+        Replace the IDs of a patient record with IDs unique within the database.
+        
+        Records are generated independently, so their own IDs only tell apart the
+        entries of one patient.
+        
+        Args:
+            patient_record: Record from generate_full_patient_record, updated in place
+        """
+        patient_id = self._next_id("PT")
+        patient_record["patient"]["patient_id"] = patient_id
+        
+        next_ids = self._next_ids
+        encounters = patient_record["encounters"]
+        observations = patient_record["observations"]
+        medications = patient_record["medications"]
+        
+        encounter_ids = {}
+        for number, encounter in enumerate(encounters, next_ids["ENC"]):
+            encounter_id = f"ENC{number}"
+            encounter_ids[encounter["encounter_id"]] = encounter_id
+            encounter["encounter_id"] = encounter_id
+            encounter["patient_id"] = patient_id
+        next_ids["ENC"] += len(encounters)
+        
+        for number, observation in enumerate(observations, next_ids["OBS"]):
+            observation["observation_id"] = f"OBS{number}"
+            observation["patient_id"] = patient_id
+            observation["encounter_id"] = encounter_ids[observation["encounter_id"]]
+        next_ids["OBS"] += len(observations)
+        
+        for number, medication in enumerate(medications, next_ids["MED"]):
+            medication["medication_id"] = f"MED{number}"
+            medication["patient_id"] = patient_id
+            medication["encounter_id"] = encounter_ids[medication["encounter_id"]]
+        next_ids["MED"] += len(medications)
+    
+    def _iter_patient_records(self, num_patients: int) -> Iterator[Dict[str, Any]]:
+        """
+        Generate patient records one at a time, with their final IDs assigned.
+        
+        Args:
+            num_patients: Number of patient records to generate
+            
+        Returns:
+            Iterator over the patient records in generation order
+        """
+        # Each patient is generated from its own seed, so the database is the same
+        # for a given seed whatever the number of worker processes
+        patient_seeds = [self.rng.getrandbits(64) for _ in range(num_patients)]
+        
+        # Read the clock once, so all records of the database share the same date
+        self._today = datetime.date.today()
+        executor = None
+        try:
+            if self.workers > 1:
+                print(f"Generating with {self.workers} worker processes")
+                executor = ProcessPoolExecutor(max_workers=self.workers,
+                                               initializer=_init_worker,
+                                               initargs=(self.output_dir, self._today))
+                chunk_size = max(1, num_patients // (self.workers * 4))
+                patient_records = executor.map(_generate_seeded_record, patient_seeds,
+                                               chunksize=chunk_size)
+            else:
+                # A separate generator keeps this one's ID counters for the final IDs
+                record_generator = SyntheticEHRGenerator(self.output_dir)
+                record_generator._today = self._today
+                patient_records = map(record_generator._generate_seeded_record, patient_seeds)
+            
+            # Generate patient records
+            for i, patient_record in enumerate(patient_records):
+                if i % 10 == 0:
+                    print(f"Generated {i} patients...")
+                
+                self._assign_record_ids(patient_record)
+                yield patient_record
+        finally:
+            self._today = None
+            if executor is not None:
+                executor.shutdown()
+    
     def generate_database(self, num_patients: int = 100) -> Dict[str, Any]:
         """
         Generate a complete synthetic EHR database with multiple patients.
@@ -586,14 +767,7 @@ class SyntheticEHRGenerator:
         all_observations = []
         all_medications = []
         
-        # Generate patient records
-        for i in range(num_patients):
-            if i % 10 == 0:
-                print(f"Generated {i} patients...")
-                
-            # Generate patient record
-            patient_record = self.generate_full_patient_record()
-            
+        for patient_record in self._iter_patient_records(num_patients):
             # Extract components
             patients.append(patient_record["patient"])
             all_encounters.extend(patient_record["encounters"])
@@ -615,6 +789,62 @@ class SyntheticEHRGenerator:
         
         return database
     
+    def stream_database(self, num_patients: int = 100) -> None:
+        """
+        Generate a synthetic EHR database straight to NDJSON files, one per entity type.
+        
+        Each patient record is written as soon as it is generated, so memory use
+        does not grow with the number of patients.
+        
+        Args:
+            num_patients: Number of patient records to generate
+        """
+        print(f"Generating synthetic EHR database with {num_patients} patients...")
+        
+        counts = dict.fromkeys(("patients", "encounters", "observations", "medications"), 0)
+        
+        with ExitStack() as stack:
+            files = {
+                entity_type: stack.enter_context(open(
+                    os.path.join(self.output_dir, f"{entity_type}.ndjson"), 'wb',
+                    buffering=IO_BUFFER_SIZE))
+                for entity_type in counts
+            }
+            
+            for patient_record in self._iter_patient_records(num_patients):
+                files["patients"].write(_dumps_line(patient_record["patient"]))
+                counts["patients"] += 1
+                for entity_type in ("encounters", "observations", "medications"):
+                    entities = patient_record[entity_type]
+                    files[entity_type].writelines(map(_dumps_line, entities))
+                    counts[entity_type] += len(entities)
+        
+        print(f"Generated {counts['patients']} patients with " +
+              f"{counts['encounters']} encounters, " +
+              f"{counts['observations']} observations, and " +
+              f"{counts['medications']} medications.")
+        for entity_type, file in files.items():
+            print(f"Saved {counts[entity_type]} {entity_type} to {file.name}")
+    
+    def _write_json(self, file_path: str, data: Any) -> None:
+        """
+        Write data to a JSON file, indented if pretty output was requested.
+        
+        Args:
+            file_path: Path of the file to write
+            data: The data to serialize
+        """
+        if orjson is not None:
+            option = orjson.OPT_INDENT_2 if self.pretty else None
+            with open(file_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=option))
+        elif self.pretty:
+            with open(file_path, 'w') as f:
+                json.dump(data, f, indent=2)
+        else:
+            with open(file_path, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+    
     def save_database(self, database: Dict[str, Any], split_files: bool = True) -> None:
         """
         Save the generated database to JSON files.
@@ -627,14 +857,12 @@ class SyntheticEHRGenerator:
             # Save each entity type to a separate file
             for entity_type, entities in database.items():
                 filename = os.path.join(self.output_dir, f"{entity_type}.json")
-                with open(filename, 'w') as f:
-                    json.dump(entities, f, indent=2)
+                self._write_json(filename, entities)
                 print(f"Saved {len(entities)} {entity_type} to {filename}")
         else:
             # Save entire database to a single file
             filename = os.path.join(self.output_dir, "legacy_ehr_database.json")
-            with open(filename, 'w') as f:
-                json.dump(database, f, indent=2)
+            self._write_json(filename, database)
             print(f"Saved entire database to {filename}")
 
 
@@ -645,11 +873,20 @@ def main():
     parser.add_argument('--patients', type=int, default=50, help='Number of patients to generate')
     parser.add_argument('--seed', type=int, help='Random seed for reproducibility')
     parser.add_argument('--single-file', action='store_true', help='Save as a single file instead of separate files')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes used to generate patient records')
+    parser.add_argument('--pretty', action='store_true', help='Indent the JSON files')
+    parser.add_argument('--output-format', choices=['json', 'ndjson'], default='json', help='Format of the generated entity files; ndjson streams records to disk as they are generated (ehr_extractor.py reads json only) and ignores --single-file')
     
     args = parser.parse_args()
     
     # Initialize generator
-    generator = SyntheticEHRGenerator(output_dir=args.output, seed=args.seed)
+    generator = SyntheticEHRGenerator(output_dir=args.output, seed=args.seed, workers=args.workers,
+                                     pretty=args.pretty)
+    
+    if args.output_format == 'ndjson':
+        # Generate and save database record by record
+        generator.stream_database(num_patients=args.patients)
+        return
     
     # Generate database
     database = generator.generate_database(num_patients=args.patients)